@@ -0,0 +1,45 @@
+# Run from the project root: python -m benchmarks.compression_benchmark
+import time
+
+import core
+import network.url
+from network.url import URL
+from benchmarks.server import StandInServer
+
+REQUESTS = 20
+# Simulated link speed, in bytes per second.
+BANDWIDTH = 4 * 1024 * 1024
+PAGE = ("<html><head><title>Benchmark</title></head><body>" +
+        "".join(f'<div class="row"><p id="p{i}">Paragraph {i} of some '
+                f'fairly repetitive page text.</p></div>\n' for i in range(5000)) +
+        "</body></html>").encode("utf8")
+
+def run(server, path, accept_encoding):
+    network.url.ACCEPT_ENCODING = accept_encoding
+    server.reset_counters()
+    start = time.time()
+    for _ in range(REQUESTS):
+        body = URL(server.url(path)).request()
+        assert body == PAGE.decode("utf8")
+    return server.bytes_sent, time.time() - start
+
+def main():
+    with StandInServer() as server:
+        # Trickle the body out in 100 steps a second to model a slow link.
+        for encoding in ["gzip", "deflate"]:
+            server.route(f"/{encoding}", body=PAGE, compress=encoding,
+                         bandwidth=BANDWIDTH, chunk_size=BANDWIDTH // 100)
+
+        plain_bytes, plain_time = run(server, "/gzip", None)
+        print(f"{REQUESTS} loads of a {len(PAGE)} byte page "
+              f"at {BANDWIDTH // 1024} KiB/s")
+        print(f"  identity: {plain_bytes:10d} bytes  {plain_time * 1000:8.1f} ms")
+        for path in ["/gzip", "/deflate"]:
+            sent, elapsed = run(server, path, "gzip, deflate")
+            print(f"  {path[1:]:8s}: {sent:10d} bytes  {elapsed * 1000:8.1f} ms"
+                  f"  ({plain_bytes / sent:.1f}x fewer bytes)")
+
+        network.url.CONNECTION_POOL.close_all()
+
+if __name__ == "__main__":
+    main()
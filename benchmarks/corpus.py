@@ -0,0 +1,120 @@
+# Deterministic documents for the parser benchmarks, plus the vendored
+# real pages in benchmarks/vendored/.
+import random
+from pathlib import Path
+
+VENDORED_DIR = Path(__file__).parent / "vendored"
+
+def mixed_page(size=2 * 1024 * 1024, seed=0):
+    # Roughly the shape of a news or documentation page: nested containers,
+    # class-heavy markup, links, inline styles and runs of prose.
+    rng = random.Random(seed)
+    words = ["browser", "layout", "the", "of", "network", "style", "paint",
+             "a", "document", "tree", "and", "render", "cache", "to", "text"]
+    parts = ['<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+             '<title>Generated page</title>'
+             '<link rel="stylesheet" href="/css/site.css"></head><body>']
+    length = 0
+    i = 0
+    while length < size:
+        prose = " ".join(rng.choice(words) for _ in range(rng.randint(5, 40)))
+        block = (f'<div class="card col-{i % 12} {"featured" if i % 7 == 0 else ""}" '
+                 f'id="card-{i}" data-index="{i}">'
+                 f'<h2 class="title">Heading {i}</h2>'
+                 f'<p style="color: #333; margin: 0 4px">{prose} '
+                 f'<a href="/articles/{i}?ref=home&amp;page={i % 9}" '
+                 f"title='Article {i}'>read more</a> &amp; "
+                 f'<span class=tag>tag{i % 5}</span></p>'
+                 f'<img src="/img/{i}.png" alt="Picture {i}" width=120 height=80>'
+                 f'<br/><input type="checkbox" checked disabled></div>\n')
+        parts.append(block)
+        length += len(block)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def deep_nesting(depth=5000, trees=4):
+    parts = ["<html><body>"]
+    for t in range(trees):
+        for i in range(depth):
+            parts.append(f'<div class="level-{i % 10}">')
+        parts.append(f"innermost text {t}")
+        parts.append("</div>" * depth)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def wide_siblings(count=100000):
+    items = "".join(f"<li>item {i}</li>" for i in range(count))
+    return f"<html><body><ul>{items}</ul></body></html>"
+
+def attribute_heavy(count=20000, seed=0):
+    rng = random.Random(seed)
+    parts = ["<html><body>"]
+    for i in range(count):
+        parts.append(
+            f'<input id="field-{i}" name="f{i}" class="form-control input-{i % 7}" '
+            f"type=text value='value {rng.randint(0, 10 ** 6)}' data-row={i // 10} "
+            f'data-col="{i % 10}" aria-label="Field number {i}" required '
+            f'placeholder="Type here" style="width: {rng.randint(10, 90)}%">')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def huge_text(nodes=4, size=1024 * 1024, seed=0):
+    rng = random.Random(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing"]
+    parts = ["<html><body>"]
+    for _ in range(nodes):
+        text = []
+        length = 0
+        while length < size:
+            word = rng.choice(words)
+            text.append(word)
+            length += len(word) + 1
+        parts.append("<p>" + " ".join(text) + "</p>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+def large_stylesheet(size=400 * 1024):
+    # Utility-class heavy, like the big CSS frameworks, with the things
+    # this parser can't handle (pseudo-classes, selector lists, child
+    # combinators, @media) mixed in to exercise error recovery.
+    colors = ["red", "blue", "#333", "#f8f9fa", "rgba(0, 0, 0, 0.5)", "white"]
+    parts = []
+    length = 0
+    i = 0
+    while length < size:
+        color = colors[i % len(colors)]
+        # Descendant rules whose ancestors mixed_page has on every card, on
+        # one card in twelve, or nowhere at all.
+        descendant = [".card .tag", f".col-{i % 12} .title", f"div .card-{i} p"][i % 3]
+        block = (f".m-{i} {{ margin: {i % 5}px {i % 3}px; }}\n"
+                 f".p-{i} {{ padding: {i % 4}px !important; }}\n"
+                 f".text-{i} {{ color: {color}; font: bold {10 + i % 8}px serif; "
+                 f"display: block }}\n"
+                 f"{descendant} {{ font-size: {90 + i % 20}%; line-height: 1.5; }}\n"
+                 f".btn-{i}:hover {{ color: {color}; }}\n"
+                 f".col-{i}, .col-md-{i} {{ width: {i % 100}%; }}\n"
+                 f".nav > .item-{i} {{ display: inline; }}\n")
+        if i % 50 == 0:
+            block += f"@media (min-width: {i}px) {{ .container {{ max-width: {i}px; }} }}\n"
+        parts.append(block)
+        length += len(block)
+        i += 1
+    return "".join(parts)
+
+def vendored(suffix):
+    """Returns `(name, text)` for each vendored file ending in `suffix`."""
+    return [(path.name, path.read_text(encoding="utf-8"))
+            for path in sorted(VENDORED_DIR.glob("*" + suffix))]
+
+def html_documents():
+    return [
+        ("mixed", mixed_page()),
+        ("deep_nesting", deep_nesting()),
+        ("wide_siblings", wide_siblings()),
+        ("attribute_heavy", attribute_heavy()),
+        ("huge_text", huge_text()),
+    ] + vendored(".html")
+
+def stylesheets():
+    return [("large_stylesheet", large_stylesheet())] + vendored(".css")
@@ -0,0 +1,124 @@
+# Run from the project root: python -m benchmarks.css_benchmark [sheet.css ...]
+# Compares the character-at-a-time CSS parser with the regex-driven one.
+# With no arguments a framework-sized stylesheet is generated; pass real
+# framework stylesheets to use those instead.
+import sys
+
+import core
+from parser.css_parser import CSSParser
+from style.selectors import DescendantSelector
+from benchmarks.corpus import large_stylesheet
+from benchmarks.timing import best_time
+
+class LegacyCSSParser(CSSParser):
+    """The previous implementation, kept here for comparison."""
+
+    def whitespace(self):
+        while self.i < len(self.s) and self.s[self.i].isspace():
+            self.i += 1
+
+    def word(self):
+        start = self.i
+        while self.i < len(self.s):
+            if self.s[self.i].isalnum() or self.s[self.i] in "#-.%":
+                self.i += 1
+            else:
+                break
+        if self.i == start:
+            raise Exception("Parsing error")
+        return self.s[start:self.i]
+
+    def parse(self):
+        rules = []
+        while self.i < len(self.s):
+            try:
+                self.whitespace()
+                selector = self.selector()
+                self.literal("{")
+                self.whitespace()
+                body = self.body()
+                self.literal("}")
+                rules.append((selector, body))
+            except Exception:
+                why = self.ignore_until(["}"])
+                if why == "}":
+                    self.literal("}")
+                    self.whitespace()
+                else:
+                    break
+        return rules
+
+    def pair(self):
+        prop = self.word()
+        self.whitespace()
+        self.literal(":")
+        self.whitespace()
+        val_start = self.i
+        while self.i < len(self.s) and self.s[self.i] not in [";", "}"]:
+            self.i += 1
+        val = self.s[val_start:self.i].strip()
+        important = False
+        if "!important" in val:
+            important = True
+            val = val.replace("!important", "").strip()
+        return prop.casefold(), val, important
+
+    def body(self):
+        pairs = {}
+        while self.i < len(self.s) and self.s[self.i] != "}":
+            try:
+                prop, val, important = self.pair()
+                expanded = self.expand_shorthand(prop, val)
+                for key, value in expanded.items():
+                    pairs[key] = (value, important)
+                self.whitespace()
+                self.literal(";")
+                self.whitespace()
+            except Exception:
+                why = self.ignore_until([";", "}"])
+                if why == ";":
+                    self.literal(";")
+                    self.whitespace()
+                else:
+                    break
+        return pairs
+
+    def ignore_until(self, chars):
+        while self.i < len(self.s):
+            if self.s[self.i] in chars:
+                return self.s[self.i]
+            else:
+                self.i += 1
+        return None
+
+def describe(rules):
+    out = []
+    for selector, body in rules:
+        parts = selector.selectors if isinstance(selector, DescendantSelector) else [selector]
+        out.append(([(s.tag, s.class_name) for s in parts], body))
+    return out
+
+def parse(parser_class, sheet):
+    return parser_class(sheet).parse()
+
+def main():
+    sheets = []
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf8", errors="replace") as f:
+            sheets.append((path, f.read()))
+    if not sheets:
+        sheets.append(("generated", large_stylesheet()))
+
+    for name, sheet in sheets:
+        rules = CSSParser(sheet).parse()
+        if describe(LegacyCSSParser(sheet).parse()) != describe(rules):
+            print(f"{name}: parsed rules differ")
+            continue
+        before = best_time(parse, LegacyCSSParser, sheet)
+        after = best_time(parse, CSSParser, sheet)
+        print(f"{name}: {len(sheet) / 1024:.0f} KiB, {len(rules)} rules")
+        print(f"  before: {before * 1000:8.1f} ms")
+        print(f"  after:  {after * 1000:8.1f} ms  ({before / after:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
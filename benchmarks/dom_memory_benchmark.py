@@ -0,0 +1,126 @@
+# Run from the project root: python -m benchmarks.dom_memory_benchmark [page.html ...]
+# Measures, with tracemalloc, how much memory a parsed and styled document
+# keeps alive, next to the node classes and per-node style dicts they
+# replaced. With no arguments a ~4 MB page is generated; pass saved
+# real-world pages to use those instead. Styling runs slowly under
+# tracemalloc, so expect this to take a while on large pages.
+import sys
+import tracemalloc
+
+import core
+from config.constants import SELF_CLOSING_TAGS
+from parser.html_parser import HTMLParser
+from parser.stylesheet_cache import STYLESHEET_CACHE
+from style.style_engine import style
+from benchmarks.corpus import mixed_page
+
+# The previous node classes, kept here for comparison: every node has a
+# __dict__ and its own children list.
+class LegacyText:
+    def __init__(self, text, parent):
+        self.text = text
+        self.children = []
+        self.parent = parent
+
+class LegacyElement:
+    def __init__(self, tag, attributes, parent):
+        self.tag = tag
+        self.attributes = attributes
+        self.children = []
+        self.parent = parent
+        self.style = {}
+
+def unshared(name):
+    # The lexer interns names now; before, each element had its own copy.
+    return (" " + name)[1:]
+
+class LegacyHTMLParser(HTMLParser):
+    """Builds the same tree shape as HTMLParser out of the legacy nodes."""
+
+    def add_text(self, text):
+        if text.isspace() or not self.unfinished:
+            return
+        parent = self.unfinished[-1]
+        parent.children.append(LegacyText(text, parent))
+
+    def add_tag(self, tag, attributes):
+        if tag.startswith("!"):
+            return
+        if tag.startswith("/"):
+            if len(self.unfinished) > 1:
+                self.unfinished.pop()
+            return
+        attributes = {unshared(key): value for key, value in attributes.items()}
+        parent = self.unfinished[-1]
+        node = LegacyElement(unshared(tag), attributes, parent)
+        parent.children.append(node)
+        if tag not in SELF_CLOSING_TAGS:
+            self.unfinished.append(node)
+
+    def parse(self):
+        self.unfinished = [LegacyElement("html", {}, None)]
+        self.feed(self.body)
+        return self.close()
+
+def nodes_of(tree):
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children)
+
+def measure(body, rules):
+    tracemalloc.start()
+    try:
+        tree = HTMLParser(body).parse()
+        parsed = tracemalloc.get_traced_memory()[0]
+        style(tree, rules, None)
+        styled = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return tree, parsed, styled - parsed
+
+def measure_legacy(body, styled_tree):
+    # The old engine gave every node a dict of its own holding all of its
+    # properties, which is a plain copy of each computed style.
+    tracemalloc.start()
+    try:
+        tree = LegacyHTMLParser(body).parse()
+        parsed = tracemalloc.get_traced_memory()[0]
+        for legacy, node in zip(nodes_of(tree), nodes_of(styled_tree)):
+            legacy.style = dict(node.style)
+        styled = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return tree, parsed, styled - parsed
+
+def report(label, before, after, count):
+    print(f"  {label:15s} {before / 1024 / 1024:8.1f} MiB -> "
+          f"{after / 1024 / 1024:6.1f} MiB  "
+          f"({before / count:5.0f} -> {after / count:5.0f} bytes/node)")
+
+def main():
+    pages = []
+    for path in sys.argv[1:]:
+        with open(path, "rb") as f:
+            pages.append((path, f.read().decode("utf8", "replace")))
+    if not pages:
+        pages.append(("generated", mixed_page(4 * 1024 * 1024)))
+
+    rules = list(STYLESHEET_CACHE.default_sheet())
+    for name, body in pages:
+        tree, dom, computed = measure(body, rules)
+        legacy_tree, legacy_dom, legacy_computed = measure_legacy(body, tree)
+        nodes = list(nodes_of(tree))
+        count = len(nodes)
+        if count != sum(1 for _ in nodes_of(legacy_tree)):
+            print(f"{name}: legacy tree differs")
+            continue
+        styles = len({id(node.style) for node in nodes})
+        print(f"{name}: {len(body) / 1024 / 1024:.2f} MiB, {count} nodes, "
+              f"{styles} distinct computed styles")
+        report("DOM:", legacy_dom, dom, count)
+        report("computed style:", legacy_computed, computed, count)
+
+if __name__ == "__main__":
+    main()
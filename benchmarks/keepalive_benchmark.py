@@ -0,0 +1,40 @@
+# Run from the project root: python -m benchmarks.keepalive_benchmark
+import time
+
+import core
+import network.url
+from network.connection import ConnectionPool
+from network.url import URL
+from benchmarks.server import StandInServer
+
+REQUESTS = 200
+BODY = b"<html><body>" + b"<p>hello</p>" * 100 + b"</body></html>"
+
+def run(pool, url):
+    network.url.CONNECTION_POOL = pool
+    start = time.time()
+    for _ in range(REQUESTS):
+        URL(url).request()
+    elapsed = time.time() - start
+    pool.close_all()
+    return elapsed, pool.stats()
+
+def main():
+    with StandInServer() as server:
+        server.route("/page", body=BODY, content_type="text/html")
+        server.route("/redirect", redirect="/page")
+
+        for path in ["/page", "/redirect"]:
+            # A negative idle timeout marks every pooled connection stale,
+            # which is the same as the old connect-per-request behaviour.
+            cold_time, cold = run(ConnectionPool(idle_timeout=-1), server.url(path))
+            warm_time, warm = run(ConnectionPool(), server.url(path))
+            print(f"{path}: {REQUESTS} loads")
+            print(f"  no reuse:   {cold['connects']:4d} connects  {cold_time * 1000:8.1f} ms")
+            print(f"  keep-alive: {warm['connects']:4d} connects  {warm_time * 1000:8.1f} ms"
+                  f"  ({warm['reuses']} reuses)")
+            print(f"  saved:      {cold['connects'] - warm['connects']:4d} connects  "
+                  f"{(cold_time - warm_time) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
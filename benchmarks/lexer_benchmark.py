@@ -0,0 +1,119 @@
+# Run from the project root: python -m benchmarks.lexer_benchmark [page.html ...]
+# Compares the character-at-a-time lexer and attribute splitter with the
+# regex scanner that replaced them. With no arguments a ~2 MB page is
+# generated; pass saved real-world pages to use those instead.
+import sys
+
+from parser.lexer import lex, TextToken
+from benchmarks.corpus import mixed_page
+from benchmarks.timing import best_time
+
+# The previous implementation, kept here for comparison.
+class LegacyTextToken:
+    def __init__(self, text):
+        self.text = text
+
+class LegacyTagToken:
+    def __init__(self, tag):
+        self.tag = tag.strip().casefold()
+
+def legacy_lex(body):
+    out = []
+    buffer = ""
+    in_tag = False
+    for c in body:
+        if c == "<":
+            if buffer:
+                out.append(LegacyTextToken(buffer))
+                buffer = ""
+            in_tag = True
+        elif c == ">":
+            out.append(LegacyTagToken(buffer))
+            buffer = ""
+            in_tag = False
+        else:
+            buffer += c
+    if buffer and not in_tag:
+        out.append(LegacyTextToken(buffer))
+    return out
+
+def legacy_get_attributes(text):
+    parts = []
+    current = ""
+    in_quotes = False
+    quote_char = None
+    for char in text:
+        if char in ['"', "'"]:
+            if not in_quotes:
+                in_quotes = True
+                quote_char = char
+            elif char == quote_char:
+                in_quotes = False
+                quote_char = None
+            current += char
+        elif char.isspace() and not in_quotes:
+            if current:
+                parts.append(current)
+                current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    if not parts:
+        return "", {}
+    tag = parts[0].casefold()
+    attributes = {}
+    for attrpair in parts[1:]:
+        if "=" in attrpair:
+            key, value = attrpair.split("=", 1)
+            if len(value) > 2 and value[0] in ["'", "\""]:
+                value = value[1:-1]
+            attributes[key.casefold()] = value
+        else:
+            attributes[attrpair.casefold()] = ""
+    return tag, attributes
+
+def legacy_tokens(body):
+    for token in legacy_lex(body):
+        if isinstance(token, LegacyTextToken):
+            yield ("text", token.text)
+        else:
+            yield ("tag",) + legacy_get_attributes(token.tag)
+
+def new_tokens(body):
+    for token in lex(body):
+        if isinstance(token, TextToken):
+            yield ("text", token.text)
+        else:
+            yield ("tag", token.tag, token.attributes)
+
+def legacy_scan(body):
+    # What HTMLParser.parse used to do: lex everything, then split each tag.
+    for token in legacy_lex(body):
+        if isinstance(token, LegacyTagToken):
+            legacy_get_attributes(token.tag)
+
+def scan(body):
+    for token in lex(body):
+        pass
+
+def main():
+    pages = []
+    for path in sys.argv[1:]:
+        with open(path, "rb") as f:
+            pages.append((path, f.read().decode("utf8", "replace")))
+    if not pages:
+        pages.append(("generated", mixed_page()))
+
+    for name, body in pages:
+        if list(legacy_tokens(body)) != list(new_tokens(body)):
+            print(f"{name}: token streams differ")
+            continue
+        before = best_time(legacy_scan, body)
+        after = best_time(scan, body)
+        print(f"{name}: {len(body) / 1024 / 1024:.2f} MiB")
+        print(f"  before: {before * 1000:8.1f} ms")
+        print(f"  after:  {after * 1000:8.1f} ms  ({before / after:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Run from the project root: python -m benchmarks.network_benchmark [--tls]
+# Drives URL.request against the local stand-in server and reports
+# per-load latency percentiles and throughput.
+import ssl
+import sys
+import time
+
+import core
+import network.url
+from network.cache import HTTPCache
+from network.connection import ConnectionPool
+from network.redirects import RedirectCache
+from network.tls import TLSClient
+from network.url import URL
+from benchmarks.server import StandInServer
+
+LOADS = 100
+LATENCY = 0.002
+PAGE = ("<html><head><title>Benchmark</title></head><body>" +
+        "".join(f'<div class="row"><p id="p{i}">Paragraph {i} of some '
+                f'fairly repetitive page text.</p></div>\n' for i in range(500)) +
+        "</body></html>")
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def reset_network(tls, keep_alive=True):
+    # Every scenario starts from empty caches and an empty pool; nothing is
+    # written to the user's disk cache.
+    network.url.CACHE = HTTPCache()
+    network.url.REDIRECT_CACHE = RedirectCache()
+    network.url.CONNECTION_POOL = ConnectionPool(
+        idle_timeout=30 if keep_alive else -1, tls=tls)
+
+def measure(server, url, prepare=None):
+    latencies = []
+    body_bytes = 0
+    server.reset_counters()
+    start = time.perf_counter()
+    for _ in range(LOADS):
+        if prepare:
+            prepare()
+        load_start = time.perf_counter()
+        body = URL(url).request()
+        latencies.append(time.perf_counter() - load_start)
+        body_bytes += len(body)
+    elapsed = time.perf_counter() - start
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "loads_per_second": LOADS / elapsed,
+        "body_bytes_per_second": body_bytes / elapsed,
+        "requests": server.requests,
+        "bytes_sent": server.bytes_sent,
+    }
+
+def report(name, result):
+    print(f"  {name:28s} p50 {result['p50'] * 1000:7.2f} ms  "
+          f"p95 {result['p95'] * 1000:7.2f} ms  "
+          f"{result['loads_per_second']:7.1f} loads/s  "
+          f"{result['body_bytes_per_second'] / 1024 / 1024:6.1f} MiB/s  "
+          f"{result['requests']:4d} requests  {result['bytes_sent']:9d} bytes sent")
+
+def main():
+    use_tls = "--tls" in sys.argv[1:]
+    server = StandInServer(tls=use_tls).start()
+
+    def new_tls_client():
+        # A client with no saved TLS sessions, trusting the server's
+        # self-signed certificate.
+        if use_tls:
+            return TLSClient(ssl.create_default_context(cafile=server.cafile))
+        return TLSClient()
+
+    plain = server.route("/plain", body=PAGE, latency=LATENCY)
+    gzipped = server.route("/gzip", body=PAGE, latency=LATENCY,
+                           compress="gzip", chunked=True)
+    cached = server.route("/cached", body=PAGE, latency=LATENCY,
+                          cache_control="max-age=3600")
+    etagged = server.route("/etag", body=PAGE, latency=LATENCY,
+                           etag='"v1"', cache_control="max-age=0")
+    redirected = server.redirect_chain("/redirect", "/plain", 3, latency=LATENCY)
+    permanent = server.redirect_chain("/moved", "/plain", 3, status=301,
+                                      latency=LATENCY)
+
+    print(f"{LOADS} loads per scenario, {len(PAGE)} byte page, "
+          f"{LATENCY * 1000:.0f} ms server latency, {server.scheme}")
+    # (name, url, warm the caches first, start from nothing on every load)
+    scenarios = [
+        ("cold (new connection)", plain, False, True),
+        ("uncached (keep-alive)", plain, False, False),
+        ("uncached gzip, chunked", gzipped, False, False),
+        ("cached", cached, True, False),
+        ("revalidated (304)", etagged, True, False),
+        ("3 redirects", redirected, False, False),
+        ("3 redirects, remembered", permanent, True, False),
+    ]
+    for name, url, warm, cold in scenarios:
+        reset_network(new_tls_client(), keep_alive=not cold)
+        if warm:
+            URL(url).request()
+        prepare = (lambda: reset_network(new_tls_client(), keep_alive=False)) if cold else None
+        report(name, measure(server, url, prepare))
+        network.url.CONNECTION_POOL.close_all()
+
+    server.stop()
+
+if __name__ == "__main__":
+    main()
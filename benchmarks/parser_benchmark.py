@@ -0,0 +1,115 @@
+# Run from the project root: python -m benchmarks.parser_benchmark [results.jsonl]
+# Times the lexer, HTML parser and CSS parser over the benchmark corpus and
+# measures peak memory with tracemalloc. Each run is appended as one JSON
+# line to the results file (benchmarks/results/parser_benchmark.jsonl by
+# default) and compared with the previous run in it.
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import core
+from parser.css_parser import CSSParser
+from parser.html_parser import HTMLParser
+from parser.lexer import lex
+from benchmarks import corpus
+from benchmarks.timing import ROUNDS, best_time
+
+RESULTS_PATH = Path(__file__).parent / "results" / "parser_benchmark.jsonl"
+
+def count_tokens(body):
+    return sum(1 for _ in lex(body))
+
+def count_nodes(body):
+    # Iterative, since the deep_nesting documents are deeper than the
+    # recursion limit.
+    count = 0
+    stack = [HTMLParser(body).parse()]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+def count_rules(sheet):
+    return len(CSSParser(sheet).parse())
+
+def peak_memory(function, text):
+    tracemalloc.start()
+    try:
+        function(text)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure(kind, unit, function, name, text):
+    count = function(text)
+    elapsed = best_time(function, text)
+    return {
+        "case": f"{kind}/{name}",
+        "bytes": len(text.encode("utf-8")),
+        unit: count,
+        "seconds": elapsed,
+        f"{unit}_per_second": count / elapsed,
+        "peak_memory": peak_memory(function, text),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_previous(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+    except OSError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+def rate(result):
+    return next(value for key, value in result.items() if key.endswith("_per_second"))
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else RESULTS_PATH
+    previous = load_previous(path)
+    previous_rates = {r["case"]: rate(r) for r in previous["results"]} if previous else {}
+
+    results = []
+    for name, body in corpus.html_documents():
+        results.append(measure("lex", "tokens", count_tokens, name, body))
+        results.append(measure("html", "nodes", count_nodes, name, body))
+    for name, sheet in corpus.stylesheets():
+        results.append(measure("css", "rules", count_rules, name, sheet))
+
+    for result in results:
+        unit = next(key[:-len("_per_second")] for key in result
+                    if key.endswith("_per_second"))
+        line = (f"  {result['case']:36s} {result['bytes'] / 1024:8.0f} KiB "
+                f"{result['seconds'] * 1000:9.1f} ms {rate(result):12,.0f} {unit}/s "
+                f"{result['peak_memory'] / 1024 / 1024:8.1f} MiB peak")
+        if result["case"] in previous_rates:
+            line += f"  ({rate(result) / previous_rates[result['case']]:.2f}x previous)"
+        print(line)
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rounds": ROUNDS,
+        "results": results,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"Results appended to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# A local stand-in for the web, so the network code can be measured
+# offline. Run it on its own to browse a small demo site:
+#   python -m benchmarks.server [port] [--tls]
+# and then: python main.py http://127.0.0.1:<port>/
+import gzip
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CHUNK_SIZE = 4096
+
+class Route:
+    """How the server answers one path.
+
+    `latency` is slept before the response starts, `bandwidth` (bytes per
+    second) throttles the body, `chunked` sends it with chunked transfer
+    encoding and `compress` ("gzip" or "deflate") applies a content
+    encoding when the client accepts it. A route with an `etag` answers a
+    matching If-None-Match with 304, and one with `redirect` is a redirect.
+    """
+
+    def __init__(self, body=b"", status=200, content_type="text/html; charset=utf-8",
+                 headers=None, latency=0, bandwidth=None, chunked=False,
+                 chunk_size=CHUNK_SIZE, compress=None, cache_control=None,
+                 etag=None, last_modified=None, redirect=None):
+        if isinstance(body, str):
+            body = body.encode("utf8")
+        self.body = body
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.chunked = chunked
+        self.chunk_size = chunk_size
+        self.compress = compress
+        self.cache_control = cache_control
+        self.etag = etag
+        self.last_modified = last_modified
+        self.redirect = redirect
+
+    def encode(self, accept_encoding):
+        if self.compress == "gzip" and "gzip" in accept_encoding:
+            return gzip.compress(self.body), "gzip"
+        if self.compress == "deflate" and "deflate" in accept_encoding:
+            return zlib.compress(self.body), "deflate"
+        return self.body, None
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        route = stand_in.routes.get(self.path.split("?", 1)[0])
+        with stand_in.lock:
+            stand_in.requests += 1
+        if route is None:
+            self.send_body(Route(b"<h1>404 Not Found</h1>", status=404))
+            return
+        if route.latency:
+            time.sleep(route.latency)
+
+        if route.redirect:
+            self.send_response(route.status if 300 <= route.status < 400 else 302)
+            self.send_header("Location", route.redirect)
+            if route.cache_control:
+                self.send_header("Cache-Control", route.cache_control)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if route.etag and self.headers.get("If-None-Match") == route.etag:
+            with stand_in.lock:
+                stand_in.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", route.etag)
+            if route.cache_control:
+                self.send_header("Cache-Control", route.cache_control)
+            self.end_headers()
+            return
+
+        self.send_body(route)
+
+    def send_body(self, route):
+        body, encoding = route.encode(self.headers.get("Accept-Encoding", ""))
+        self.send_response(route.status)
+        self.send_header("Content-Type", route.content_type)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if route.cache_control:
+            self.send_header("Cache-Control", route.cache_control)
+        if route.etag:
+            self.send_header("ETag", route.etag)
+        if route.last_modified:
+            self.send_header("Last-Modified", route.last_modified)
+        for header, value in route.headers.items():
+            self.send_header(header, value)
+        if route.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        for i in range(0, len(body), route.chunk_size):
+            piece = body[i:i + route.chunk_size]
+            if route.chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            else:
+                self.wfile.write(piece)
+            with self.server.stand_in.lock:
+                self.server.stand_in.bytes_sent += len(piece)
+            if route.bandwidth:
+                time.sleep(len(piece) / route.bandwidth)
+        if route.chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+def make_certificate(directory):
+    # Needs the openssl command line tool.
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+         "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True)
+    return cert, key
+
+class StandInServer:
+    """A scriptable local HTTP (or HTTPS) server on 127.0.0.1.
+
+    Add routes with `route()` or `redirect_chain()`, before or after
+    `start()`. With `tls=True` a self-signed certificate is made and its
+    path kept in `cafile`, for building a client context that trusts it.
+    """
+
+    def __init__(self, tls=False, port=0):
+        self.routes = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.cafile = None
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.stand_in = self
+        self.scheme = "https" if tls else "http"
+        if tls:
+            self.cafile, key = make_certificate(tempfile.mkdtemp())
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cafile, key)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self.port = self.httpd.server_address[1]
+
+    def route(self, path, **options):
+        self.routes[path] = Route(**options)
+        return self.url(path)
+
+    def redirect_chain(self, path, target, hops, status=302, **options):
+        """Makes `path` reach `target` through `hops` redirects."""
+        for i in range(hops):
+            here = path if i == 0 else f"{path}/{i}"
+            there = target if i == hops - 1 else f"{path}/{i + 1}"
+            self.route(here, status=status, redirect=there, **options)
+        return self.url(path)
+
+    def url(self, path):
+        return f"{self.scheme}://127.0.0.1:{self.port}{path}"
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.not_modified = 0
+            self.bytes_sent = 0
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def demo_site(server):
+    links = "".join(f'<li><a href="/page{i}">Page {i}</a></li>' for i in range(5))
+    server.route("/", body=f"<html><head><title>Stand-in</title>"
+                           f'<link rel="stylesheet" href="/style.css"></head>'
+                           f"<body><h1>Stand-in server</h1><ul>{links}"
+                           f'<li><a href="/redirect">Redirect chain</a></li>'
+                           f'<li><a href="/slow">Slow page</a></li></ul></body></html>',
+                 cache_control="max-age=60")
+    server.route("/style.css", body="h1 { color: blue; }", content_type="text/css",
+                 cache_control="max-age=3600")
+    for i in range(5):
+        server.route(f"/page{i}", body=f"<html><body><h1>Page {i}</h1>" +
+                     "<p>Some text.</p>" * 200 + "</body></html>",
+                     compress="gzip", chunked=True, etag=f'"page{i}"',
+                     cache_control="max-age=0")
+    server.redirect_chain("/redirect", "/page0", 3)
+    server.route("/slow", body="<p>Finally.</p>" * 1000, latency=0.5,
+                 bandwidth=64 * 1024)
+
+def main():
+    args = sys.argv[1:]
+    tls = "--tls" in args
+    ports = [int(arg) for arg in args if arg.isdigit()]
+    server = StandInServer(tls=tls, port=ports[0] if ports else 8000)
+    demo_site(server)
+    print(f"Serving {server.url('/')}")
+    if server.cafile:
+        print(f"  self-signed certificate: {server.cafile}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Run from the project root: python -m benchmarks.style_benchmark [page.html sheet.css ...]
+# Compares styling a page by testing every rule against every node with
+# styling through the rule index, without and with the ancestor filter.
+# With no arguments a generated page is styled with a generated
+# framework-sized stylesheet; otherwise pass saved pages and stylesheets,
+# and each page is styled with all the sheets.
+import sys
+import time
+
+import core
+from parser.css_parser import CSSParser
+from parser.html_parser import HTMLParser
+from parser.stylesheet_cache import STYLESHEET_CACHE
+from dom.utils import walk
+from style import style_engine
+from style.rule_index import RuleIndex
+from style.ancestor_filter import AncestorFilter
+from benchmarks.corpus import mixed_page, large_stylesheet
+from benchmarks.timing import ROUNDS, best_time
+
+class LegacyRuleIndex:
+    """The previous cascade, kept here for comparison: every rule is
+    tested against every node and each property's values are sorted."""
+
+    def __init__(self, rules):
+        self.rules = rules
+
+    def cascade(self, node, ancestors=None):
+        all_properties = {}
+        for selector, body in self.rules:
+            if selector.matches(node):
+                base_priority = selector.priority
+                for prop, (val, important) in body.items():
+                    priority = base_priority + (10000 if important else 0)
+                    if prop not in all_properties:
+                        all_properties[prop] = []
+                    all_properties[prop].append((priority, val))
+        winners = {}
+        for prop, values in all_properties.items():
+            values.sort(key=lambda x: x[0], reverse=True)
+            winners[prop] = values[0]
+        return winners
+
+def style_tree(tree, index, ancestors=None):
+    if ancestors is not None:
+        style_engine.style(tree, index, None, ancestors)
+    else:
+        for node in walk(tree):
+            style_engine.style_node(node, index)
+
+def run(index, body, ancestors=None):
+    tree = HTMLParser(body).parse()
+    style_tree(tree, index, ancestors)
+    return tree
+
+def time_styling(index, body, ancestors=None):
+    return best_time(style_tree, index, ancestors,
+                     setup=lambda: HTMLParser(body).parse())
+
+def same_styles(a, b):
+    return all(dict(x.style) == dict(y.style) for x, y in zip(walk(a), walk(b)))
+
+def main():
+    pages = []
+    sheets = []
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf8", errors="replace") as f:
+            (sheets if path.endswith(".css") else pages).append((path, f.read()))
+    if not pages:
+        pages.append(("generated", mixed_page(64 * 1024)))
+    if not sheets:
+        sheets.append(("generated", large_stylesheet()))
+
+    rules = list(STYLESHEET_CACHE.default_sheet())
+    for _, sheet in sheets:
+        rules.extend(CSSParser(sheet).parse())
+    legacy = LegacyRuleIndex(rules)
+    start = time.perf_counter()
+    index = RuleIndex(rules)
+    build = time.perf_counter() - start
+
+    for name, body in pages:
+        before_tree = run(legacy, body)
+        after_tree = run(index, body)
+        filtered_tree = run(index, body, AncestorFilter())
+        if not (same_styles(before_tree, after_tree)
+                and same_styles(before_tree, filtered_tree)):
+            print(f"{name}: computed styles differ")
+            continue
+        before = time_styling(legacy, body)
+        after = time_styling(index, body)
+        ancestors = AncestorFilter()
+        filtered = time_styling(index, body, ancestors)
+        print(f"{name}: {len(body) / 1024:.0f} KiB, "
+              f"{sum(1 for _ in walk(after_tree))} nodes, {len(rules)} rules")
+        print(f"  before: {before * 1000:8.1f} ms")
+        print(f"  after:  {after * 1000:8.1f} ms  ({before / after:.1f}x faster, "
+              f"plus {build * 1000:.1f} ms to build the index)")
+        print(f"  filter: {filtered * 1000:8.1f} ms  ({before / filtered:.1f}x faster, "
+              f"{ancestors.fast_rejects / ROUNDS:,.0f} of "
+              f"{ancestors.queries / ROUNDS:,.0f} descendant matches rejected early)")
+
+if __name__ == "__main__":
+    main()
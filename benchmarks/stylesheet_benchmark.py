@@ -0,0 +1,40 @@
+# Run from the project root: python -m benchmarks.stylesheet_benchmark
+import time
+
+import core
+import core.tab
+import network.url
+from network.cache import HTTPCache
+from network.url import URL
+from benchmarks.server import StandInServer
+
+STYLESHEETS = 6
+LATENCY = 0.1
+SHEET = b"".join(b"p.c%d { color: blue; margin: 1px 2px; }\n" % i for i in range(200))
+
+def run(server, max_fetches):
+    # Start cold every time so each run really goes to the network.
+    network.url.CACHE = HTTPCache()
+    core.tab.MAX_STYLESHEET_FETCHES = max_fetches
+    page = URL(server.url("/index.html"))
+    links = [f"/style{i}.css" for i in range(STYLESHEETS)]
+    start = time.time()
+    rules = core.tab.load_stylesheets(page, links)
+    return time.time() - start, len(rules)
+
+def main():
+    with StandInServer() as server:
+        for i in range(STYLESHEETS):
+            server.route(f"/style{i}.css", body=SHEET, content_type="text/css",
+                         latency=LATENCY)
+
+        print(f"{STYLESHEETS} stylesheets, {LATENCY * 1000:.0f} ms server latency")
+        for max_fetches in [1, STYLESHEETS]:
+            elapsed, count = run(server, max_fetches)
+            print(f"  {max_fetches} at a time: {elapsed * 1000:7.1f} ms "
+                  f"({count} rules, {elapsed / LATENCY:.1f} round-trips)")
+
+        network.url.CONNECTION_POOL.close_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# Timing shared by the parsing and styling benchmarks.
+import time
+
+ROUNDS = 3
+
+def best_time(function, *args, setup=None):
+    """The fastest of ROUNDS calls of `function(*args)`, in seconds.
+
+    With `setup`, it is called before every round, outside the timed part,
+    and its result is passed as the first argument; use it for input that
+    the function consumes, such as a freshly parsed tree.
+    """
+    best = None
+    for _ in range(ROUNDS):
+        call_args = (setup(),) + args if setup else args
+        start = time.perf_counter()
+        function(*call_args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,59 @@
+# Run from the project root: python -m benchmarks.tls_benchmark
+# Needs the openssl command line tool to make a self-signed certificate.
+import ssl
+import time
+
+import core
+import network.url
+from network.cache import HTTPCache
+from network.connection import ConnectionPool
+from network.tls import TLSClient
+from network.url import URL
+from benchmarks.server import StandInServer
+
+REQUESTS = 100
+BODY = b"<html><body><p>hello</p></body></html>"
+
+class UncachedTLSClient(TLSClient):
+    # What every https fetch used to do: load the CA bundle into a new
+    # context and do a full handshake.
+    def __init__(self, cafile):
+        super().__init__()
+        self.cafile = cafile
+
+    def get_context(self):
+        return ssl.create_default_context(cafile=self.cafile)
+
+    def save_session(self, tls, host, port):
+        pass
+
+def run(tls, url):
+    # A negative idle timeout forces a new connection, and so a new
+    # handshake, for every request.
+    pool = ConnectionPool(idle_timeout=-1, tls=tls)
+    network.url.CONNECTION_POOL = pool
+    network.url.CACHE = HTTPCache()
+    start = time.time()
+    for _ in range(REQUESTS):
+        URL(url).request()
+    elapsed = time.time() - start
+    pool.close_all()
+    return elapsed, tls.stats()
+
+def main():
+    with StandInServer(tls=True) as server:
+        url = server.route("/", body=BODY)
+
+        print(f"{REQUESTS} https loads, one new connection each")
+        cold_time, cold = run(UncachedTLSClient(server.cafile), url)
+        print(f"  new context, full handshakes: {cold_time * 1000:8.1f} ms total, "
+              f"{cold['handshake_time'] * 1000 / REQUESTS:6.2f} ms per handshake, "
+              f"{cold['resumed']} resumed")
+        warm_time, warm = run(
+            TLSClient(ssl.create_default_context(cafile=server.cafile)), url)
+        print(f"  shared context, resumption:   {warm_time * 1000:8.1f} ms total, "
+              f"{warm['handshake_time'] * 1000 / REQUESTS:6.2f} ms per handshake, "
+              f"{warm['resumed']} resumed")
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ USER_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 # User data files
 BOOKMARKS_PATH = USER_DATA_DIR / "bookmarks.txt"
+CACHE_DIR = USER_DATA_DIR / "cache"
 
 def get_user_data_path(filename):
     """Get path for user data files."""
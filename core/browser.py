@@ -2,8 +2,14 @@ import tkinter
 import tkinter.font
 from config.constants import Width, Height
 from network.url import URL
+from network.connection import CONNECTION_POOL
+from network.cache import CACHE
+from parser.stylesheet_cache import STYLESHEET_CACHE
 from ui.chrome import Chrome
 from .tab import Tab
+from .loader import Loader
+
+PRUNE_INTERVAL = 10000
 
 class BrowserWindow:
     def __init__(self, browser, initial_url=None):
@@ -42,12 +48,19 @@ class BrowserWindow:
         self.window.protocol("WM_DELETE_WINDOW", self.handle_window_close)
         
         self.chrome = Chrome(self)
+        self.loader = Loader(self)
+        self.window.after(PRUNE_INTERVAL, self.prune_network)
         
         if initial_url:
             self.new_tab(initial_url)
         else:
             self.new_tab(URL("https://browser.engineering/"))
     
+    def prune_network(self):
+        self.browser.connection_pool.prune()
+        self.browser.cache.sweep()
+        self.window.after(PRUNE_INTERVAL, self.prune_network)
+
     def handle_new_window(self, e):
         self.browser.new_window()
     
@@ -145,7 +158,7 @@ class BrowserWindow:
         # Calculate Height dynamically based on current window height if available, else default
         # Actually Height is constant initially, but handled in resize.
         # Tab needs height.
-        new_tab = Tab(Height - self.chrome.bottom)
+        new_tab = Tab(Height - self.chrome.bottom, self.loader)
         new_tab.load(url)
         self.active_tab = new_tab
         self.tabs.append(new_tab)
@@ -154,6 +167,7 @@ class BrowserWindow:
     def close_tab(self, tab):
         index = self.tabs.index(tab)
         self.tabs.remove(tab)
+        tab.cancel_load()
         
         if len(self.tabs) == 0:
             self.browser.close_window(self)
@@ -170,6 +184,14 @@ class BrowserWindow:
 class Browser:
     def __init__(self):
         self.windows = []
+        # Every tab in every window fetches through the same pool, so a
+        # connection opened by one tab can be reused by another.
+        self.connection_pool = CONNECTION_POOL
+        self.cache = CACHE
+        # Parsed stylesheets are shared the same way. Parse the browser's
+        # own sheet now rather than during the first page load.
+        self.stylesheets = STYLESHEET_CACHE
+        self.stylesheets.default_sheet()
     
     def new_window(self, url=None):
         window = BrowserWindow(self, url)
@@ -179,8 +201,10 @@ class Browser:
     def close_window(self, window):
         if window in self.windows:
             self.windows.remove(window)
+            window.loader.shutdown()
             window.window.destroy()
         
         if len(self.windows) == 0:
+            self.connection_pool.close_all()
             import sys
             sys.exit(0)
@@ -0,0 +1,84 @@
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from network.handle import RequestHandle, RequestCancelled
+
+MAX_CONCURRENT_LOADS = 4
+POLL_INTERVAL = 16
+
+class Loader:
+    """Runs page loads off the Tk thread.
+
+    Work runs on a thread pool; its results are queued and picked up by a
+    `window.after` poll, so callbacks only ever run on the Tk thread.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LOADS)
+        self.results = queue.Queue()
+        self.handles = set()
+        self.closed = False
+        self.window.window.after(POLL_INTERVAL, self.poll)
+
+    def start(self, work, callback):
+        """Runs `work(handle)` on a worker, then `callback(result)` on Tk.
+
+        Returns the handle; cancelling it aborts the work's requests and
+        drops its result.
+        """
+        handle = RequestHandle()
+        self.handles.add(handle)
+
+        def run():
+            result = None
+            try:
+                result = work(handle)
+            except RequestCancelled:
+                pass
+            except Exception:
+                traceback.print_exc()
+            self.results.put((handle, callback, result, True))
+
+        self.executor.submit(run)
+        return handle
+
+    def post(self, handle, callback, result):
+        """Runs `callback(result)` on Tk while `handle`'s work carries on.
+
+        For intermediate results, such as a partly loaded page; dropped if
+        the handle is cancelled first.
+        """
+        self.results.put((handle, callback, result, False))
+
+    def poll(self):
+        if self.closed:
+            return
+        # A failing callback mustn't stop the polling, or no later result
+        # would ever reach this window.
+        try:
+            delivered = False
+            while True:
+                try:
+                    handle, callback, result, final = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                if final:
+                    self.handles.discard(handle)
+                if handle.cancelled:
+                    continue
+                try:
+                    callback(result)
+                except Exception:
+                    traceback.print_exc()
+                delivered = True
+            if delivered:
+                self.window.draw()
+        finally:
+            self.window.window.after(POLL_INTERVAL, self.poll)
+
+    def shutdown(self):
+        self.closed = True
+        for handle in list(self.handles):
+            handle.cancel()
+        self.executor.shutdown(wait=False)
@@ -1,50 +1,270 @@
 from config.constants import Height, VSTEP, SELF_CLOSING_TAGS
-from dom.utils import tree_to_list
-from dom.nodes import Element, Text
+from dom.utils import find, find_last
+from dom.nodes import Text
 from network.url import URL, VISITED_URLS
+from network.handle import RequestCancelled
 from parser.html_parser import HTMLParser
-from parser.css_parser import CSSParser
+from parser.stylesheet_cache import STYLESHEET_CACHE
+from parser.preload_scanner import scan_stylesheets, StreamScanner
 from style.style_engine import style
 from layout.document_layout import DocumentLayout
 from rendering.utils import paint_tree
 from config.constants import *
-from config.paths import BROWSER_CSS_PATH
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 
+MAX_STYLESHEET_FETCHES = 6
+# How often a page that is still downloading gets repainted, in seconds.
+PROGRESSIVE_PAINT_INTERVAL = 0.2
+# Repaints of a large page are spaced out further, so that building them
+# takes at most about 1/PARTIAL_COST_RATIO of the download.
+PARTIAL_COST_RATIO = 4
+# Streamed text is scanned for stylesheets in batches of at least this
+# many characters (or after PROGRESSIVE_PAINT_INTERVAL), not per recv.
+DRAIN_SIZE = 64 * 1024
 
+def fetch_stylesheet(style_url, handle=None):
+    try:
+        body = style_url.request(handle=handle)
+    except Exception:
+        return []
+    return STYLESHEET_CACHE.parse(style_url, body)
+
+ERROR_PAGE = ("<html><head><title>Error</title></head>"
+              "<body><h1></h1><p></p></body></html>")
+
+def error_page(url, error):
+    # The parser knows no character references, so the text goes straight
+    # into the tree rather than through the markup.
+    nodes = HTMLParser(ERROR_PAGE).parse()
+    for tag, text in [("h1", f"Could not load {url}"),
+                      ("p", str(error) or type(error).__name__)]:
+        elt = find(nodes, lambda node: getattr(node, "tag", None) == tag)
+        elt.children.append(Text(text, elt))
+    style(nodes, list(STYLESHEET_CACHE.default_sheet()), url)
+    return nodes
+
+class Preloader:
+    """Starts stylesheet fetches as soon as their hrefs are known.
+
+    Asking for the same href again returns the fetch already under way,
+    so the styling step picks up whatever has been preloaded.
+    """
+
+    def __init__(self, url, handle=None):
+        self.url = url
+        self.handle = handle
+        self.pool = ThreadPoolExecutor(max_workers=MAX_STYLESHEET_FETCHES)
+        self.futures = {}
+
+    def fetch(self, href):
+        if href not in self.futures:
+            self.futures[href] = self.pool.submit(
+                fetch_stylesheet, self.url.resolve(href), self.handle)
+        return self.futures[href]
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def load_stylesheets(url, links, handle=None, preloader=None):
+    # Fetch and parse every sheet concurrently, but collect the rules in
+    # document order so the cascade is the same as a sequential load.
+    if not links:
+        return []
+    own_preloader = preloader is None
+    if own_preloader:
+        preloader = Preloader(url, handle)
+    try:
+        futures = [preloader.fetch(link) for link in links]
+        rules = []
+        for future in futures:
+            rules.extend(future.result())
+        return rules
+    finally:
+        if own_preloader:
+            preloader.close()
+
+class PageBuilder:
+    """Parses and styles a page while its HTML is still arriving.
+
+    `feed()` is called from the socket read loop, so it only buffers the
+    text. Everything else happens on the builder's own worker thread, and
+    the download never waits on it: the text is scanned for stylesheets
+    to preload as it comes in, but only parsed when a partial paint is
+    due or the download is over, so parsing doesn't compete with the
+    download for the interpreter.
+
+    If there is an `on_partial`, a styled copy of the tree parsed so far
+    is passed to it every PROGRESSIVE_PAINT_INTERVAL (less often for pages
+    large enough that copying and styling the tree takes a while), as long
+    as the last one has been shown (see `partial_shown`). Partial trees
+    are styled with whichever stylesheets have arrived by then.
+    """
+
+    def __init__(self, url, handle=None, on_partial=None):
+        self.url = url
+        self.handle = handle
+        self.on_partial = on_partial
+        self.parser = HTMLParser()
+        self.scanner = StreamScanner()
+        # Get stylesheet requests on the wire as soon as their <link>s
+        # arrive, so parsing overlaps with the network.
+        self.preloader = Preloader(url, handle)
+        self.default_style_sheet = STYLESHEET_CACHE.default_sheet()
+        # One worker, so pieces are parsed in the order they arrived.
+        self.worker = ThreadPoolExecutor(max_workers=1)
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.buffered = 0
+        # Scanned for stylesheets but not yet parsed.
+        self.unparsed = []
+        self.draining = False
+        self.last_drain = time.time()
+        self.finishing = False
+        self.streamed = False
+        self.partial_pending = False
+        self.last_partial = time.time()
+        self.partial_interval = PROGRESSIVE_PAINT_INTERVAL
+
+    def feed(self, text):
+        if text is None:
+            self.restart()
+            return
+        with self.lock:
+            self.streamed = True
+            self.buffer.append(text)
+            self.buffered += len(text)
+            if self.draining or (self.buffered < DRAIN_SIZE and time.time()
+                                 - self.last_drain < PROGRESSIVE_PAINT_INTERVAL):
+                return
+            self.draining = True
+        self.worker.submit(self.drain)
+
+    def drain(self):
+        with self.lock:
+            text = "".join(self.buffer)
+            self.buffer = []
+            self.buffered = 0
+            self.draining = False
+            self.last_drain = time.time()
+        if text:
+            for href in self.scanner.feed(text):
+                self.preloader.fetch(href)
+            self.unparsed.append(text)
+
+        if (self.on_partial and not self.finishing and not self.partial_pending
+                and time.time() - self.last_partial >= self.partial_interval):
+            started = time.time()
+            self.parse_pending()
+            nodes = self.parser.snapshot()
+            style(nodes, self.arrived_rules(nodes), self.url)
+            self.partial_interval = max(PROGRESSIVE_PAINT_INTERVAL,
+                                        PARTIAL_COST_RATIO * (time.time() - started))
+            self.partial_pending = True
+            self.on_partial(nodes)
+
+    def restart(self):
+        # The request withdrew what it streamed (see URL.load); the body
+        # that finish() gets replaces it.
+        with self.lock:
+            self.buffer = []
+            self.buffered = 0
+            self.streamed = False
+        def reset():
+            self.parser = HTMLParser()
+            self.scanner = StreamScanner()
+            self.unparsed = []
+        self.worker.submit(reset)
+
+    def parse_pending(self):
+        if self.unparsed:
+            self.parser.feed("".join(self.unparsed))
+            self.unparsed = []
+
+    def partial_shown(self):
+        self.partial_pending = False
+        self.last_partial = time.time()
+
+    def finish(self, body):
+        self.finishing = True
+        # Runs after any drain already queued, so every streamed piece is
+        # in the parser before it is closed.
+        return self.worker.submit(self.build, body).result()
+
+    def build(self, body):
+        self.drain()
+        self.parse_pending()
+        # Bodies that weren't streamed (cache hits, error pages, coalesced
+        # requests) arrive all at once.
+        if not self.streamed:
+            for href in scan_stylesheets(body):
+                self.preloader.fetch(href)
+            self.parser.feed(body)
+        nodes = self.parser.close()
+        if self.handle:
+            self.handle.check()
+        self.apply_styles(nodes)
+        return nodes
+
+    def arrived_rules(self, nodes):
+        # Only the sheets already fetched, in document order; a partial
+        # paint doesn't wait for the rest.
+        rules = list(self.default_style_sheet)
+        for link in nodes.index.stylesheet_links:
+            future = self.preloader.fetch(link)
+            if future.done() and not future.cancelled():
+                rules.extend(future.result())
+        return rules
+
+    def apply_styles(self, nodes):
+        rules = list(self.default_style_sheet)
+        rules.extend(load_stylesheets(
+            self.url, nodes.index.stylesheet_links, self.handle, self.preloader))
+        if self.handle:
+            self.handle.check()
+        style(nodes, rules, self.url)
+
+    def close(self):
+        self.worker.shutdown(wait=False, cancel_futures=True)
+        self.preloader.close()
 
 class Tab:
-    def __init__(self, tab_height):
+    def __init__(self, tab_height, loader=None):
+        self.loader = loader
+        self.loading = None
+        self.shown_partial = False
+        self.nodes = None
+        self.document = None
         self.display_list = []
         self.scroll = 0
         self.scroll_step = 100
+        # The page on screen, which its links resolve against.
         self.url = None
+        # What the address bar shows: the page being loaded, if any.
+        self.display_url = None
         self.tab_height = tab_height
         self.history = []
         self.history_index = -1
 
     def get_title(self):
-        title_nodes = [node for node in tree_to_list(self.nodes, [])
-                    if isinstance(node, Element) and node.tag == "title"]
-        
-        if not title_nodes:
-            return "Untitled"
-        
-        title_text = ""
-        for child in title_nodes[0].children:
-            if isinstance(child, Text):
-                title_text += child.text
-    
-        return title_text.strip() if title_text.strip() else "Untitled"
+        if not self.nodes:
+            return "Loading..." if self.loading else "Untitled"
+        title_text = self.nodes.index.title()
+        return title_text.strip() if title_text and title_text.strip() else "Untitled"
 
     def click(self, x, y, middle_click=False):
+        if not self.document:
+            return
         y += self.scroll
         
-        objs = [obj for obj in tree_to_list(self.document, [])
-                if obj.x <= x < obj.x + obj.width
-                and obj.y <= y < obj.y + obj.height]
+        obj = find_last(self.document, lambda obj:
+                        obj.x <= x < obj.x + obj.width
+                        and obj.y <= y < obj.y + obj.height)
         
-        if not objs : return
-        elt = objs[-1].node
+        if not obj: return
+        elt = obj.node
         
         while elt:
             if isinstance(elt, Text):
@@ -52,15 +272,7 @@ class Tab:
             elif elt.tag == "a" and "href" in elt.attributes:
                 href = elt.attributes["href"]
                 if href.startswith("#"):
-                    elt_id = href[1:]
-                    target_elt = [node for node in tree_to_list(self.nodes, [])
-                                if isinstance(node, Element)
-                                and node.attributes.get("id") == elt_id]
-                    if target_elt:
-                        obj = [obj for obj in tree_to_list(self.document, [])
-                            if obj.node == target_elt[0]]
-                        if obj:
-                            self.scroll = obj[0].y
+                    self.scroll_to_fragment(href[1:])
                     return
                 
                 url = self.url.resolve(elt.attributes["href"])
@@ -70,6 +282,13 @@ class Tab:
                     return self.load(url)
             elt = elt.parent
     
+    def scroll_to_fragment(self, fragment):
+        elt = self.nodes.index.element_by_id(fragment)
+        if elt:
+            obj = find(self.document, lambda obj: obj.node == elt)
+            if obj:
+                self.scroll = obj.y
+
     def draw(self, canvas, offset):
         for cmd in self.display_list:
             if cmd.top > self.scroll + Height: continue
@@ -103,7 +322,7 @@ class Tab:
             self.scroll = max_scroll
     
     def on_resize(self, event):
-        if not hasattr(self, "document"):
+        if not self.document:
             return
         
         from config.constants import HSTEP
@@ -133,64 +352,79 @@ class Tab:
             self.history.append(url)
             self.history_index = len(self.history) - 1
         
-        self.url = url
+        self.display_url = url
         
         if url.scheme in ["http", "https"]:
             VISITED_URLS.add(str(url))
         
-        body = url.request()
-        
+        self.cancel_load()
+        self.shown_partial = False
+        if self.loader:
+            self.loading = self.loader.start(
+                lambda handle: self.fetch_page(url, handle),
+                lambda nodes: self.show_page(url, nodes))
+        else:
+            self.show_page(url, self.fetch_page(url))
+
+    def cancel_load(self):
+        if self.loading:
+            self.loading.cancel()
+            self.loading = None
+
+    def fetch_page(self, url, handle=None):
+        # Runs on a loader thread: everything up to and including style,
+        # none of which touches Tk.
+        try:
+            return self.build_page(url, handle)
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            # Say the load failed, rather than leave the old page up.
+            traceback.print_exc()
+            return error_page(url, e)
+
+    def build_page(self, url, handle=None):
         if getattr(url, "view_source", False):
-            print(body)
-            # view-source needs to handle content display differently or just print?
-            # Original code printed.
-            return
+            print(url.request(handle=handle))
+            return None
 
-        self.nodes = HTMLParser(body).parse()
-        
-        # DEFAULT_STYLE_SHEET needs to be loaded.
-        # I'll import it or load it here.
-        # It was global in browser.py
+        def show_partial(nodes):
+            def show(nodes):
+                builder.partial_shown()
+                self.show_page(url, nodes, partial=True)
+            self.loader.post(handle, show, nodes)
+
+        on_partial = show_partial if self.loader and handle else None
+        builder = PageBuilder(url, handle, on_partial)
         try:
-            with open(BROWSER_CSS_PATH, encoding="utf-8") as f:
-                default_style_sheet = CSSParser(f.read()).parse()
-        except FileNotFoundError:
-            default_style_sheet = []
-        
-        rules = default_style_sheet.copy()
-        
-        links = [node.attributes["href"]
-                for node in tree_to_list(self.nodes, [])
-                if isinstance(node, Element)
-                and node.tag == "link"
-                and node.attributes.get("rel") == "stylesheet"
-                and "href" in node.attributes]
-        
-        for link in links:
-            style_url = url.resolve(link)
-            try:
-                body = style_url.request()
-            except:
-                continue
-            rules.extend(CSSParser(body).parse())
+            body = url.request(handle=handle, on_text=builder.feed)
+            return builder.finish(body)
+        finally:
+            builder.close()
 
-        style(self.nodes, rules, url)
+    def show_page(self, url, nodes, partial=False):
+        # Runs on the Tk thread: layout measures text with Tk fonts. A
+        # partial page is the part of a still-loading page parsed so far.
+        if not partial:
+            self.loading = None
+        if nodes is None:
+            return
+        # Links on the page resolve against self.url, so it only moves to
+        # the new address once that page's nodes replace the old ones.
+        self.url = url
+        self.nodes = nodes
 
         self.document = DocumentLayout(self.nodes, width=Width - 2 * HSTEP)
         self.document.layout()
 
         if url.fragment:
-            elt = [node for node in tree_to_list(self.nodes, [])
-                if isinstance(node, Element)
-                and node.attributes.get("id") == url.fragment]
-            if elt:
-                obj = [obj for obj in tree_to_list(self.document, [])
-                    if obj.node == elt[0]]
-                if obj:
-                    self.scroll = obj[0].y
+            self.scroll_to_fragment(url.fragment)
 
         self.display_list = []
         paint_tree(self.document, self.display_list)
         
-        if not url.fragment:
+        # Once part of the page is up the user may have scrolled it; leave
+        # them where they are as the rest comes in.
+        if not url.fragment and not self.shown_partial:
             self.scroll = 0
+        self.shown_partial = partial
@@ -1,2 +1,3 @@
-from .nodes import Text, Element
-from .utils import tree_to_list
+from .nodes import Text, Element, Document, class_set
+from .index import DocumentIndex
+from .utils import walk, find, find_last, tree_to_list, copy_tree
@@ -0,0 +1,33 @@
+from .nodes import Text
+
+class DocumentIndex:
+    """Lookups over a document, kept up to date as its elements are added.
+
+    HTMLParser calls `add` for each element as it opens, in document
+    order, so the first element with an id or tag is the one found.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.tags = {}
+        self.stylesheet_links = []
+
+    def add(self, element):
+        self.tags.setdefault(element.tag, []).append(element)
+        if "id" in element.attributes:
+            self.ids.setdefault(element.attributes["id"], element)
+        if (element.tag == "link"
+                and element.attributes.get("rel") == "stylesheet"
+                and "href" in element.attributes):
+            self.stylesheet_links.append(element.attributes["href"])
+
+    def element_by_id(self, id):
+        return self.ids.get(id)
+
+    def title(self):
+        """The text of the first <title>, or None if there isn't one."""
+        titles = self.tags.get("title")
+        if not titles:
+            return None
+        return "".join(child.text for child in titles[0].children
+                       if isinstance(child, Text))
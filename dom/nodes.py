@@ -1,19 +1,48 @@
+from functools import lru_cache
+
+# Pages have hundreds of thousands of nodes, so none of these classes
+# carries a per-instance __dict__.
+
+# Most pages use a few hundred distinct class attributes at most.
+MAX_CLASS_SETS = 4096
+
+@lru_cache(maxsize=MAX_CLASS_SETS)
+def class_set(text):
+    """The classes in a `class` attribute; shared, so never modified."""
+    return frozenset(text.split())
+
 class Text:
+    __slots__ = ("text", "children", "parent", "style")
+
     def __init__(self, text, parent):
         self.text = text
-        self.children = []
+        # Text never has children; the empty tuple is shared by all of them.
+        self.children = ()
         self.parent = parent
     
     def __repr__(self):
         return repr(self.text)
 
 class Element:
+    __slots__ = ("tag", "attributes", "classes", "children", "parent", "style")
+
     def __init__(self, tag, attributes, parent):
         self.tag = tag
         self.attributes = attributes
+        self.classes = class_set(attributes.get("class", ""))
         self.children = []
         self.parent = parent
-        self.style = {}
+        # Set by the style engine, usually to a style shared with others.
+        self.style = None
     
     def __repr__(self):
         return "<" + self.tag + ">"
+
+class Document(Element):
+    """The root of a parsed page, carrying its `DocumentIndex`."""
+
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        super().__init__("html", {}, None)
+        self.index = index
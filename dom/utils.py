@@ -1,5 +1,60 @@
+from .nodes import Text, Element
+
+# The walkers below work on any tree whose nodes have a `children`
+# sequence, so they serve the layout tree as well as the DOM. They keep a
+# stack of child iterators rather than recursing, so deeply nested pages
+# don't hit the recursion limit and no list of the whole tree is built.
+
+def walk(tree, prune=None):
+    """Yields `tree` and its descendants in document order.
+
+    The children of any node for which `prune(node)` is true are skipped.
+    Stop iterating to stop the walk.
+    """
+    yield tree
+    if not tree.children or (prune and prune(tree)):
+        return
+    stack = [iter(tree.children)]
+    while stack:
+        for node in stack[-1]:
+            yield node
+            if node.children and not (prune and prune(node)):
+                stack.append(iter(node.children))
+                break
+        else:
+            stack.pop()
+
+def find(tree, predicate, prune=None):
+    """The first node in document order matching `predicate`, or None."""
+    for node in walk(tree, prune):
+        if predicate(node):
+            return node
+    return None
+
+def find_last(tree, predicate, prune=None):
+    """The last node in document order matching `predicate`, or None."""
+    found = None
+    for node in walk(tree, prune):
+        if predicate(node):
+            found = node
+    return found
+
 def tree_to_list(tree, list):
-    list.append(tree)
-    for child in tree.children:
-        tree_to_list(child, list)
+    list.extend(walk(tree))
     return list
+
+def copy_tree(tree, parent=None):
+    if isinstance(tree, Text):
+        return Text(tree.text, parent)
+    root = Element(tree.tag, tree.attributes, parent)
+    stack = [(tree, root)]
+    while stack:
+        original, copy = stack.pop()
+        for child in original.children:
+            if isinstance(child, Text):
+                copy.children.append(Text(child.text, copy))
+            else:
+                child_copy = Element(child.tag, child.attributes, copy)
+                copy.children.append(child_copy)
+                stack.append((child, child_copy))
+    return root
@@ -1 +1,281 @@
-CACHE = {}
+import sys
+import threading
+import time
+from collections import OrderedDict
+from .disk_cache import DiskCache, is_expendable
+
+# Bodies are stored decoded: Content-Encoding is undone by the response
+# reader before anything reaches the cache, so a hit never pays for
+# decompression again.
+
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+MAX_ENTRY_BYTES = 4 * 1024 * 1024
+# Statuses a response may be stored with. Redirects never get here: they
+# are remembered by the redirect cache. 5xx is never stored: an error must
+# not replace the copy that stale-if-error would serve.
+CACHEABLE_STATUSES = {200, 203, 204, 404, 410}
+
+def parse_cache_control(value):
+    directives = {}
+    for part in value.lower().split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            name, arg = part.split("=", 1)
+            directives[name.strip()] = arg.strip().strip('"')
+        else:
+            directives[part] = True
+    return directives
+
+def seconds(directives, name):
+    try:
+        return max(int(directives.get(name, 0)), 0)
+    except (TypeError, ValueError):
+        return 0
+
+class CacheEntry:
+    def __init__(self, body, expires, max_age=0, etag=None, last_modified=None,
+                 stale_while_revalidate=0, stale_if_error=0):
+        self.body = body
+        self.expires = expires
+        self.max_age = max_age
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self.size = sys.getsizeof(body)
+
+    @classmethod
+    def from_response(cls, body, headers, status=200):
+        """Builds an entry for a response, or None if it may not be stored."""
+        if status not in CACHEABLE_STATUSES:
+            return None
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        if "no-store" in directives:
+            return None
+        entry = cls(body, 0)
+        entry.update(headers)
+        if entry.expires <= time.time():
+            # Only a 200 is kept just to be revalidated; anything else
+            # needs explicit freshness.
+            if status != 200 or not entry.has_validators():
+                return None
+        return entry
+
+    def update(self, headers):
+        # Used both for a new response and for the headers of a 304, which
+        # restart the freshness window and may carry new validators.
+        if "cache-control" in headers:
+            directives = parse_cache_control(headers["cache-control"])
+            if "no-cache" in directives:
+                self.max_age = 0
+            else:
+                self.max_age = seconds(directives, "max-age")
+            self.stale_while_revalidate = seconds(directives, "stale-while-revalidate")
+            self.stale_if_error = seconds(directives, "stale-if-error")
+        self.expires = time.time() + self.max_age
+        self.etag = headers.get("etag", self.etag)
+        self.last_modified = headers.get("last-modified", self.last_modified)
+
+    def metadata(self):
+        return {
+            "expires": self.expires,
+            "max_age": self.max_age,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "stale_while_revalidate": self.stale_while_revalidate,
+            "stale_if_error": self.stale_if_error,
+        }
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.expires
+
+    def has_validators(self):
+        return bool(self.etag or self.last_modified)
+
+    def can_serve_while_revalidating(self, now=None):
+        return (now or time.time()) < self.expires + self.stale_while_revalidate
+
+    def can_serve_on_error(self, now=None):
+        return (now or time.time()) < self.expires + self.stale_if_error
+
+    def is_expendable(self, now=None):
+        return is_expendable(self.metadata(), now)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class HTTPCache:
+    """An in-memory response cache bounded by total body size.
+
+    Entries are evicted least recently used first once the byte budget is
+    exceeded, and expired entries are swept out rather than waiting for
+    someone to look them up. When given a `disk` tier, misses fall through
+    to it and everything stored is written through to it.
+    """
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, max_entry_bytes=MAX_ENTRY_BYTES,
+                 disk=None):
+        self.disk = disk
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+        self.stale_hits = 0
+        self.revalidations = 0
+        self.revalidating = set()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Returns the entry for `key`, which may be stale.
+
+        Stale entries are only kept while they can still be revalidated or
+        served under stale-while-revalidate / stale-if-error; callers check
+        `is_fresh()` before using the body as-is.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.is_expendable():
+                self.remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.count_lookup(entry)
+                return entry
+        if self.disk:
+            found = self.disk.get(key)
+            if found:
+                body, meta = found
+                entry = CacheEntry(body, **meta)
+                self.insert(key, entry)
+                with self.lock:
+                    self.count_lookup(entry)
+                return entry
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def count_lookup(self, entry):
+        if entry.is_fresh():
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+
+    def put(self, key, body, headers, status=200):
+        entry = CacheEntry.from_response(body, headers, status)
+        if entry is None:
+            return None
+        if self.disk:
+            self.disk.put(key, body, entry.metadata())
+        self.insert(key, entry)
+        return entry
+
+    def refresh(self, key, entry, headers):
+        """Applies the headers of a 304 Not Modified to a stored entry."""
+        with self.lock:
+            entry.update(headers)
+            self.revalidations += 1
+        if self.disk:
+            self.disk.update(key, entry.metadata())
+
+    def start_revalidation(self, key):
+        # At most one background revalidation per key at a time.
+        with self.lock:
+            if key in self.revalidating:
+                return False
+            self.revalidating.add(key)
+            return True
+
+    def finish_revalidation(self, key):
+        with self.lock:
+            self.revalidating.discard(key)
+
+    def insert(self, key, entry):
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            # One huge page must not flush everything else.
+            if entry.size > self.max_entry_bytes:
+                self.rejected += 1
+                return False
+            self.entries[key] = entry
+            self.size += entry.size
+            if self.size > self.max_bytes:
+                self.sweep_expired()
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+            return True
+
+    def remove(self, key):
+        entry = self.entries.pop(key)
+        self.size -= entry.size
+        return entry
+
+    def sweep_expired(self):
+        now = time.time()
+        expired = [key for key, entry in self.entries.items()
+                   if entry.is_expendable(now)]
+        for key in expired:
+            self.remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def sweep(self):
+        if self.disk:
+            self.disk.evict_in_background()
+        with self.lock:
+            return self.sweep_expired()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        if self.disk:
+            self.disk.clear()
+
+    def stats(self):
+        stats = {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+            "stale_hits": self.stale_hits,
+            "revalidations": self.revalidations,
+        }
+        if self.disk:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+def open_disk_cache():
+    try:
+        return DiskCache()
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error opening disk cache: {e}")
+        return None
+
+CACHE = HTTPCache(disk=open_disk_cache())
@@ -0,0 +1,183 @@
+import select
+import socket
+import ssl
+import threading
+import time
+from .dns import RESOLVER, connect
+from .response import ResponseReader
+from .tls import TLS_CLIENT
+
+MAX_CONNECTIONS_PER_HOST = 6
+IDLE_TIMEOUT = 30
+# How often a request queued for a connection slot checks its handle, as
+# a backstop to the wakeup that cancelling the handle sends.
+ACQUIRE_POLL_INTERVAL = 1.0
+
+class Connection:
+    def __init__(self, key, sock):
+        self.key = key
+        self.sock = sock
+        self.reader = ResponseReader(sock)
+        self.last_used = time.time()
+        self.requests = 0
+        self.dns_time = 0.0
+        self.connect_time = 0.0
+        self.handshake_time = 0.0
+
+    def is_stale(self, idle_timeout):
+        if time.time() - self.last_used > idle_timeout:
+            return True
+        # An idle connection should have nothing to read. If the socket is
+        # readable the server has either closed it or sent garbage.
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def abort(self):
+        # Unlike close(), shutdown() also interrupts a recv that another
+        # thread is blocked in.
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+class ConnectionPool:
+    def __init__(self, max_per_host=MAX_CONNECTIONS_PER_HOST,
+                 idle_timeout=IDLE_TIMEOUT, resolver=RESOLVER, tls=TLS_CLIENT):
+        self.resolver = resolver
+        self.tls = tls
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.idle = {}
+        self.in_use = {}
+        self.lock = threading.Condition()
+
+        self.connects = 0
+        self.reuses = 0
+        self.stale_closed = 0
+        self.connect_time = 0.0
+
+    def acquire(self, scheme, host, port, fresh=False, handle=None):
+        """Returns a connection, waiting for a free slot if the host has
+        none. Cancelling `handle` ends the wait with RequestCancelled."""
+        key = (scheme, host, port)
+        with self.lock:
+            if handle:
+                handle.watch(self.lock)
+            try:
+                while True:
+                    if handle:
+                        handle.check()
+                    conn = None if fresh else self.take_idle(key)
+                    if conn:
+                        self.reuses += 1
+                        self.in_use[key] = self.in_use.get(key, 0) + 1
+                        return conn
+                    if self.open_count(key) >= self.max_per_host and self.idle.get(key):
+                        # A fresh connection was asked for but idle ones are
+                        # holding the slots; give up the oldest.
+                        self.idle[key].pop(0).close()
+                    if self.open_count(key) < self.max_per_host:
+                        self.in_use[key] = self.in_use.get(key, 0) + 1
+                        break
+                    self.lock.wait(ACQUIRE_POLL_INTERVAL)
+            finally:
+                if handle:
+                    handle.unwatch(self.lock)
+
+        try:
+            conn = self.connect(key)
+        except Exception:
+            with self.lock:
+                self.in_use[key] -= 1
+                self.lock.notify()
+            raise
+        return conn
+
+    def release(self, conn, reusable=True):
+        if isinstance(conn.sock, ssl.SSLSocket):
+            self.tls.save_session(conn.sock, conn.key[1], conn.key[2])
+        with self.lock:
+            self.in_use[conn.key] -= 1
+            if reusable:
+                conn.last_used = time.time()
+                self.idle.setdefault(conn.key, []).append(conn)
+            else:
+                conn.close()
+            self.lock.notify()
+
+    def take_idle(self, key):
+        conns = self.idle.get(key, [])
+        while conns:
+            # Most recently used first: it is the least likely to be stale.
+            conn = conns.pop()
+            if conn.is_stale(self.idle_timeout):
+                self.stale_closed += 1
+                conn.close()
+                continue
+            return conn
+        return None
+
+    def open_count(self, key):
+        return self.in_use.get(key, 0) + len(self.idle.get(key, []))
+
+    def connect(self, key):
+        scheme, host, port = key
+        start = time.time()
+        addresses = self.resolver.resolve(host, port)
+        resolved = time.time()
+        s = connect(addresses)
+        connected = time.time()
+        handshake_time = 0.0
+        try:
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if scheme == "https":
+                s, handshake_time = self.tls.wrap(s, host, port)
+        except Exception:
+            s.close()
+            raise
+        with self.lock:
+            self.connects += 1
+            self.connect_time += time.time() - start
+        conn = Connection(key, s)
+        conn.dns_time = resolved - start
+        conn.connect_time = connected - resolved
+        conn.handshake_time = handshake_time
+        return conn
+
+    def prune(self):
+        with self.lock:
+            for key, conns in self.idle.items():
+                fresh = []
+                for conn in conns:
+                    if conn.is_stale(self.idle_timeout):
+                        self.stale_closed += 1
+                        conn.close()
+                    else:
+                        fresh.append(conn)
+                self.idle[key] = fresh
+
+    def close_all(self):
+        with self.lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            self.idle = {}
+
+    def stats(self):
+        return {
+            "connects": self.connects,
+            "reuses": self.reuses,
+            "stale_closed": self.stale_closed,
+            "connect_time": self.connect_time,
+        }
+
+CONNECTION_POOL = ConnectionPool()
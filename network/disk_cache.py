@@ -0,0 +1,317 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config.paths import CACHE_DIR
+
+MAX_DISK_BYTES = 256 * 1024 * 1024
+# Index changes are written out at most this often, in seconds, and at
+# exit. A crash loses only the last few seconds of index updates.
+INDEX_FLUSH_INTERVAL = 5
+# Entry metadata stored alongside each body, as produced by
+# CacheEntry.metadata().
+ENTRY_FIELDS = ["expires", "max_age", "etag", "last_modified",
+                "stale_while_revalidate", "stale_if_error"]
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def is_valid_record(meta):
+    """Whether an index record has every field, with the right types."""
+    if not isinstance(meta, dict):
+        return False
+    digest = meta.get("digest")
+    if not (isinstance(digest, str) and len(digest) == 64
+            and all(c in "0123456789abcdef" for c in digest)):
+        return False
+    if not (isinstance(meta.get("size"), int) and meta["size"] >= 0):
+        return False
+    if not all(is_number(meta.get(name)) for name in
+               ["expires", "max_age", "stale_while_revalidate",
+                "stale_if_error", "last_used"]):
+        return False
+    return all(meta.get(name) is None or isinstance(meta[name], str)
+               for name in ["etag", "last_modified"])
+
+def is_expendable(meta, now=None):
+    # An expired entry is still worth keeping while it can be revalidated
+    # or served stale.
+    now = now or time.time()
+    if meta.get("etag") or meta.get("last_modified"):
+        return False
+    grace = max(meta.get("stale_while_revalidate", 0), meta.get("stale_if_error", 0))
+    return now >= meta["expires"] + grace
+
+def atomic_write(path, data):
+    # Write to a temporary file in the same directory and rename it over the
+    # target, so a crash leaves either the old file or the new one.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+class DiskCache:
+    """The on-disk tier behind the in-memory HTTP cache.
+
+    `index.json` maps cache keys to metadata and the SHA-256 of the body.
+    Bodies live under `bodies/`, named by that hash, so identical bodies
+    are stored once.
+
+    `put()` and `update()` only queue their work for a background writer,
+    so storing a response never waits on the disk. Bodies are written
+    before the index entry that refers to them. The index itself is kept
+    in memory and written out by a background flush every
+    INDEX_FLUSH_INTERVAL, so storing a response doesn't rewrite it.
+    An index that lags behind only misses some entries, and bodies it
+    doesn't mention are cleaned up on the next start.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_DISK_BYTES):
+        self.directory = directory
+        self.bodies_dir = directory / "bodies"
+        self.index_path = directory / "index.json"
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # Held while writing the index, so flushes land in order.
+        self.flush_lock = threading.Lock()
+        # One thread, so writes for a key land in the order they were made.
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.evicting = False
+        self.dirty = False
+        self.flush_timer = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+        self.index = self.load_index()
+        # Each body's size and how many keys share it, and their total.
+        self.bodies = {}
+        self.bytes = 0
+        for meta in self.index.values():
+            self.add_body(meta)
+        self.remove_orphans()
+        atexit.register(self.close)
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict):
+            return {}
+        # Drop damaged records and entries whose body never made it to
+        # disk.
+        return {key: meta for key, meta in index.items()
+                if is_valid_record(meta)
+                and self.body_path(meta["digest"]).exists()}
+
+    def mark_dirty(self):
+        # Called with self.lock held.
+        self.dirty = True
+        if self.flush_timer is None:
+            self.flush_timer = threading.Timer(INDEX_FLUSH_INTERVAL, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def flush(self):
+        """Writes the index out if it has changed since the last flush."""
+        with self.flush_lock:
+            with self.lock:
+                self.flush_timer = None
+                if not self.dirty:
+                    return
+                self.dirty = False
+                data = json.dumps(self.index).encode("utf-8")
+            try:
+                atomic_write(self.index_path, data)
+            except OSError as e:
+                print(f"Error writing disk cache index: {e}")
+                with self.lock:
+                    self.dirty = True
+
+    def body_path(self, digest):
+        return self.bodies_dir / digest
+
+    def size(self):
+        return self.bytes
+
+    def add_body(self, meta):
+        body = self.bodies.setdefault(meta["digest"], [meta["size"], 0])
+        if body[1] == 0:
+            self.bytes += body[0]
+        body[1] += 1
+
+    def drop_body(self, meta):
+        # Deletes the body file once no key refers to it.
+        digest = meta["digest"]
+        body = self.bodies[digest]
+        body[1] -= 1
+        if body[1] > 0:
+            return
+        del self.bodies[digest]
+        self.bytes -= body[0]
+        try:
+            os.unlink(self.body_path(digest))
+        except OSError:
+            pass
+
+    def get(self, key):
+        with self.lock:
+            meta = self.index.get(key)
+            if meta is None:
+                self.misses += 1
+                return None
+            if is_expendable(meta):
+                self.misses += 1
+                return None
+            try:
+                body = self.read_body(meta)
+            except (OSError, ValueError):
+                # Unreadable, or not valid UTF-8: a damaged body file.
+                self.remove(key)
+                self.mark_dirty()
+                self.misses += 1
+                return None
+            meta["last_used"] = time.time()
+            self.hits += 1
+            return body, {name: meta[name] for name in ENTRY_FIELDS if name in meta}
+
+    def read_body(self, meta):
+        # A plain read, not mmap: callers need the body as one str, and
+        # decoding a mapping copies all of it into that str just the same.
+        with open(self.body_path(meta["digest"]), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def queue(self, function, *args):
+        try:
+            return self.writer.submit(function, *args)
+        except RuntimeError:
+            # Shut down, at exit: nothing more is stored.
+            return None
+
+    def put(self, key, body, meta):
+        self.queue(self.store, key, body, dict(meta), time.time())
+
+    def store(self, key, body, meta, last_used):
+        # Runs on the writer. The body is written and synced outside the
+        # lock, so lookups don't wait on the disk.
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        record = dict(meta, digest=digest, size=len(data), last_used=last_used)
+        with self.lock:
+            # Take a reference to a body already on disk right away, so it
+            # can't be deleted before the index entry below refers to it.
+            stored = digest in self.bodies
+            if stored:
+                self.add_body(record)
+        if not stored:
+            try:
+                atomic_write(self.body_path(digest), data)
+            except OSError as e:
+                print(f"Error writing disk cache: {e}")
+                return
+        with self.lock:
+            if not stored:
+                self.add_body(record)
+            if key in self.index:
+                self.remove(key)
+            self.index[key] = record
+            self.mark_dirty()
+            over_budget = self.bytes > self.max_bytes
+        if over_budget:
+            self.evict_in_background()
+
+    def update(self, key, meta):
+        # Queued behind any put of the same key.
+        self.queue(self.apply_update, key, dict(meta), time.time())
+
+    def apply_update(self, key, meta, last_used):
+        with self.lock:
+            if key not in self.index:
+                return
+            self.index[key].update(meta, last_used=last_used)
+            self.mark_dirty()
+
+    def wait_for_writes(self):
+        """Returns once every put and update queued so far has landed."""
+        future = self.queue(lambda: None)
+        if future:
+            future.result()
+
+    def close(self):
+        # Finishes the queued writes first.
+        self.writer.shutdown()
+        self.flush()
+
+    def remove(self, key):
+        self.drop_body(self.index.pop(key))
+
+    def evict_in_background(self):
+        with self.lock:
+            if self.evicting:
+                return
+            self.evicting = True
+        threading.Thread(target=self.evict, daemon=True).start()
+
+    def evict(self):
+        try:
+            with self.lock:
+                count = len(self.index)
+                now = time.time()
+                for key in [key for key, meta in self.index.items()
+                            if is_expendable(meta, now)]:
+                    self.remove(key)
+                by_age = sorted(self.index, key=lambda k: self.index[k]["last_used"])
+                by_age.reverse()
+                while by_age and self.bytes > self.max_bytes:
+                    self.remove(by_age.pop())
+                if len(self.index) < count:
+                    self.evictions += count - len(self.index)
+                    self.mark_dirty()
+        finally:
+            self.evicting = False
+
+    def remove_orphans(self):
+        # Bodies left behind by a crash between writing a body and
+        # writing the index that refers to it.
+        live = {meta["digest"] for meta in self.index.values()}
+        for path in self.bodies_dir.iterdir():
+            if path.name not in live:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def clear(self):
+        self.wait_for_writes()
+        with self.lock:
+            for key in list(self.index):
+                self.remove(key)
+            self.dirty = True
+        self.flush()
+
+    def stats(self):
+        return {
+            "entries": len(self.index),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
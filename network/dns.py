@@ -0,0 +1,150 @@
+import errno
+import select
+import socket
+import threading
+import time
+
+DNS_TTL = 60
+MAX_DNS_ENTRIES = 256
+CONNECT_TIMEOUT = 10
+# How long to give one address before also trying the next (RFC 8305).
+CONNECTION_ATTEMPT_DELAY = 0.25
+
+IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN,
+               getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK)}
+
+def interleave(addresses):
+    # Alternate address families, starting with whichever the system
+    # resolver preferred.
+    if not addresses:
+        return []
+    first_family = addresses[0][0]
+    preferred = [a for a in addresses if a[0] == first_family]
+    others = [a for a in addresses if a[0] != first_family]
+    out = []
+    while preferred or others:
+        if preferred:
+            out.append(preferred.pop(0))
+        if others:
+            out.append(others.pop(0))
+    return out
+
+class Resolver:
+    """Caches getaddrinfo results for a bounded time.
+
+    Pass a different `getaddrinfo` to resolve names without the system
+    resolver, e.g. to point every host at a local server.
+    """
+
+    def __init__(self, ttl=DNS_TTL, max_entries=MAX_DNS_ENTRIES,
+                 getaddrinfo=socket.getaddrinfo):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.getaddrinfo = getaddrinfo
+        self.entries = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now < entry[0]:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        infos = self.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = interleave([(family, type, proto, sockaddr)
+                                for family, type, proto, _, sockaddr in infos])
+
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                self.entries = {k: e for k, e in self.entries.items() if now < e[0]}
+                while len(self.entries) >= self.max_entries:
+                    del self.entries[next(iter(self.entries))]
+            self.entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+def connect(addresses, timeout=CONNECT_TIMEOUT, delay=CONNECTION_ATTEMPT_DELAY):
+    """Connects to the first of `addresses` to answer, Happy Eyeballs style.
+
+    A new attempt is started every `delay` seconds, or as soon as an
+    earlier one fails, so one slow or blackholed address can't hold up the
+    rest. Returns a connected, blocking socket.
+    """
+    remaining = list(addresses)
+    pending = {}
+    error = None
+    deadline = time.monotonic() + timeout
+    next_attempt = 0
+
+    try:
+        while remaining or pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+
+            if remaining and (not pending or now >= next_attempt):
+                family, type, proto, sockaddr = remaining.pop(0)
+                try:
+                    s = socket.socket(family, type, proto)
+                except OSError as e:
+                    # e.g. no IPv6 support on this machine.
+                    error = e
+                    continue
+                s.setblocking(False)
+                err = s.connect_ex(sockaddr)
+                if err == 0:
+                    s.setblocking(True)
+                    return s
+                if err in IN_PROGRESS:
+                    pending[s] = sockaddr
+                    next_attempt = now + delay
+                else:
+                    error = OSError(err, f"Connect to {sockaddr} failed")
+                    s.close()
+                continue
+
+            wait_until = deadline
+            if remaining:
+                wait_until = min(deadline, next_attempt)
+            socks = list(pending)
+            _, writable, failed = select.select(
+                [], socks, socks, max(wait_until - now, 0))
+
+            for s in set(writable) | set(failed):
+                err = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                sockaddr = pending.pop(s)
+                if err == 0 and s not in failed:
+                    s.setblocking(True)
+                    return s
+                error = OSError(err, f"Connect to {sockaddr} failed")
+                s.close()
+                # Don't wait out the delay once an attempt has failed.
+                next_attempt = now
+    finally:
+        for s in pending:
+            s.close()
+
+    if pending:
+        raise socket.timeout("Connect timed out")
+    if error:
+        raise error
+    raise OSError("No addresses to connect to")
+
+RESOLVER = Resolver()
@@ -0,0 +1,53 @@
+import threading
+
+class RequestCancelled(Exception):
+    pass
+
+class RequestHandle:
+    """Lets one thread abort the requests another thread is making.
+
+    Requests made with a handle register the connection they are using
+    while it is in flight, and the condition they are waiting on while
+    queued for a connection. cancel() marks the handle, shuts those
+    connections down, which wakes up any recv blocked on them, and
+    notifies those conditions.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self.connections = set()
+        self.conditions = set()
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            connections = list(self.connections)
+            conditions = list(self.conditions)
+        for conn in connections:
+            conn.abort()
+        for condition in conditions:
+            with condition:
+                condition.notify_all()
+
+    def check(self):
+        if self.cancelled:
+            raise RequestCancelled()
+
+    def attach(self, conn):
+        with self.lock:
+            if self.cancelled:
+                raise RequestCancelled()
+            self.connections.add(conn)
+
+    def detach(self, conn):
+        with self.lock:
+            self.connections.discard(conn)
+
+    def watch(self, condition):
+        with self.lock:
+            self.conditions.add(condition)
+
+    def unwatch(self, condition):
+        with self.lock:
+            self.conditions.discard(condition)
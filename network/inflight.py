@@ -0,0 +1,64 @@
+import threading
+from .handle import RequestCancelled
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class RequestCoalescer:
+    """Makes concurrent identical requests share one network fetch.
+
+    The first caller for a key does the fetch; anyone asking for the same
+    key meanwhile waits for that fetch and gets its result.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+
+        self.fetches = 0
+        self.coalesced = 0
+
+    def run(self, key, fetch, handle=None):
+        while True:
+            with self.lock:
+                flight = self.flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.flights[key] = Flight()
+                    self.fetches += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                try:
+                    flight.result = fetch()
+                except Exception as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self.lock:
+                        del self.flights[key]
+                    flight.done.set()
+                return flight.result
+
+            # Keep an eye on our own handle while someone else fetches.
+            while not flight.done.wait(0.05):
+                if handle:
+                    handle.check()
+            if isinstance(flight.error, RequestCancelled):
+                # The leader's load was cancelled, not ours; fetch again.
+                continue
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+    def stats(self):
+        return {
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+        }
+
+IN_FLIGHT = RequestCoalescer()
@@ -0,0 +1,60 @@
+import threading
+import time
+from .cache import parse_cache_control, seconds
+
+PERMANENT_REDIRECTS = (301, 308)
+# How long to remember a permanent redirect that has no max-age.
+DEFAULT_REDIRECT_TTL = 24 * 60 * 60
+MAX_REDIRECT_ENTRIES = 512
+
+class RedirectCache:
+    """Remembers permanent redirects so later visits skip the round-trip."""
+
+    def __init__(self, default_ttl=DEFAULT_REDIRECT_TTL,
+                 max_entries=MAX_REDIRECT_ENTRIES):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            location, expires = entry
+            if time.time() >= expires:
+                del self.entries[key]
+                return None
+            self.hits += 1
+            return location
+
+    def put(self, key, status, location, headers):
+        if status not in PERMANENT_REDIRECTS:
+            return
+        directives = parse_cache_control(headers.get("cache-control", ""))
+        if "no-store" in directives or "no-cache" in directives:
+            return
+        ttl = self.default_ttl
+        if "max-age" in directives:
+            ttl = seconds(directives, "max-age")
+        if ttl <= 0:
+            return
+        with self.lock:
+            if key not in self.entries and len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = (location, time.time() + ttl)
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+        }
+
+REDIRECT_CACHE = RedirectCache()
@@ -0,0 +1,297 @@
+import codecs
+import time
+import zlib
+
+BUFFER_SIZE = 64 * 1024
+DEFAULT_CHARSET = "utf-8"
+DECODABLE_ENCODINGS = ["gzip", "x-gzip", "deflate"]
+
+class Response:
+    def __init__(self, version, status, reason, headers, body, keep_alive):
+        self.version = version
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.keep_alive = keep_alive
+        self.transferred = 0
+        self.first_byte_at = None
+        # Set when the body was already decoded as it streamed in.
+        self.decoded = None
+
+    def charset(self):
+        return get_charset(self.headers.get("content-type", ""))
+
+    def text(self):
+        if self.decoded is not None:
+            return self.decoded
+        return self.body.decode(self.charset(), "replace")
+
+def get_charset(content_type):
+    for param in content_type.split(";")[1:]:
+        if "=" not in param:
+            continue
+        name, value = param.split("=", 1)
+        if name.strip().lower() == "charset":
+            charset = value.strip().strip("\"'")
+            try:
+                return codecs.lookup(charset).name
+            except LookupError:
+                break
+    return DEFAULT_CHARSET
+
+class BodyBuffer:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    def finish(self):
+        return self.data
+
+class Decoder:
+    """Decompresses a gzip or deflate body as it arrives."""
+
+    def __init__(self, encoding, sink):
+        self.encoding = encoding
+        self.sink = sink
+        self.started = False
+        if encoding in ("gzip", "x-gzip"):
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self.decompressor = zlib.decompressobj(zlib.MAX_WBITS)
+
+    def write(self, data):
+        try:
+            out = self.decompressor.decompress(data)
+        except zlib.error:
+            if self.started or self.encoding != "deflate":
+                raise
+            # Some servers send raw deflate data without the zlib header.
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            out = self.decompressor.decompress(data)
+        self.started = True
+        if out:
+            self.sink.write(out)
+
+    def finish(self):
+        self.sink.write(self.decompressor.flush())
+        return self.sink.finish()
+
+class TextStream:
+    """Keeps the body, and also passes it on as text as it arrives.
+
+    The decoded pieces are kept too, so the body's text is only decoded
+    once (see `text`).
+    """
+
+    def __init__(self, charset, on_text):
+        self.data = bytearray()
+        self.decoder = codecs.getincrementaldecoder(charset)("replace")
+        self.on_text = on_text
+        self.pieces = []
+        self.finished = False
+
+    def write(self, data):
+        self.data += data
+        text = self.decoder.decode(data)
+        if text:
+            self.pieces.append(text)
+            self.on_text(text)
+
+    def finish(self):
+        text = self.decoder.decode(b"", final=True)
+        if text:
+            self.pieces.append(text)
+            self.on_text(text)
+        self.finished = True
+        return self.data
+
+    def text(self):
+        """The whole body as text, or None if it never passed through."""
+        return "".join(self.pieces) if self.finished else None
+
+def body_sink(content_encoding, inner=None):
+    """Builds the chain of decoders for a Content-Encoding header.
+
+    Decoded bytes end up in `inner`, or a plain buffer. Returns None when
+    the body can be read as-is and there is no `inner`."""
+    encodings = [e.strip().lower() for e in content_encoding.split(",")]
+    encodings = [e for e in encodings if e and e != "identity"]
+    if not encodings:
+        return inner
+    if any(e not in DECODABLE_ENCODINGS for e in encodings):
+        # Something we never asked for; hand the body over undecoded.
+        return BodyBuffer()
+    # Encodings are listed in the order they were applied, so the last one
+    # has to be undone first.
+    sink = inner or BodyBuffer()
+    for encoding in encodings:
+        sink = Decoder(encoding, sink)
+    return sink
+
+class ResponseReader:
+    """Reads HTTP/1.x responses off a socket as raw bytes.
+
+    Bytes are received into one preallocated buffer. Anything read past the
+    end of a response stays buffered for the next response on the same
+    connection.
+    """
+
+    def __init__(self, sock, buffer_size=BUFFER_SIZE):
+        self.sock = sock
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.received = 0
+
+    def buffered(self):
+        return self.end - self.start
+
+    def consumed(self):
+        return self.received - self.buffered()
+
+    def fill(self):
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buffer):
+            if self.start == 0:
+                # A single line longer than the buffer; grow it.
+                self.view.release()
+                self.buffer.extend(bytearray(len(self.buffer)))
+                self.view = memoryview(self.buffer)
+            else:
+                pending = self.end - self.start
+                self.buffer[:pending] = self.view[self.start:self.end]
+                self.start, self.end = 0, pending
+        n = self.sock.recv_into(self.view[self.end:])
+        self.end += n
+        self.received += n
+        return n
+
+    def read_line(self):
+        # `searched` is relative to self.start, which fill() may move.
+        searched = 0
+        while True:
+            i = self.buffer.find(b"\n", self.start + searched, self.end)
+            if i >= 0:
+                line = bytes(self.view[self.start:i + 1])
+                self.start = i + 1
+                return line
+            searched = self.end - self.start
+            if self.fill() == 0:
+                line = bytes(self.view[self.start:self.end])
+                self.start = self.end
+                return line
+
+    def read_into(self, out, n):
+        """Fills the memoryview `out` with exactly `n` bytes."""
+        pos = 0
+        pending = min(self.buffered(), n)
+        if pending:
+            out[:pending] = self.view[self.start:self.start + pending]
+            self.start += pending
+            pos = pending
+        while pos < n:
+            # Large bodies go straight from the socket into `out`.
+            got = self.sock.recv_into(out[pos:n])
+            if got == 0:
+                raise ConnectionError("Connection closed mid-body")
+            pos += got
+            self.received += got
+
+    def read_exact(self, n):
+        body = bytearray(n)
+        with memoryview(body) as out:
+            self.read_into(out, n)
+        return body
+
+    def stream(self, sink, n):
+        """Passes the next `n` bytes to `sink` as they are received."""
+        while n > 0:
+            if self.start == self.end and self.fill() == 0:
+                raise ConnectionError("Connection closed mid-body")
+            take = min(n, self.end - self.start)
+            sink.write(self.view[self.start:self.start + take])
+            self.start += take
+            n -= take
+
+    def stream_until_close(self, sink):
+        while self.start < self.end or self.fill() > 0:
+            sink.write(self.view[self.start:self.end])
+            self.start = self.end
+
+    def stream_chunked(self, sink):
+        while True:
+            line = self.read_line()
+            if not line:
+                raise ConnectionError("Connection closed mid-chunk")
+            size = int(line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                break
+            self.stream(sink, size)
+            self.read_line()
+        # Skip any trailers.
+        while self.read_line().strip():
+            pass
+
+    def read_headers(self):
+        headers = {}
+        while True:
+            line = self.read_line()
+            if not line.strip():
+                return headers
+            header, value = line.decode("iso-8859-1").split(":", 1)
+            headers[header.casefold()] = value.strip()
+
+    def read_response(self, on_text=None):
+        """Reads one response. With `on_text`, a successful response's body
+        is also passed to it as decoded text while it downloads."""
+        start = self.consumed()
+        statusline = self.read_line()
+        if not statusline:
+            raise ConnectionError("Connection closed before response")
+        first_byte_at = time.time()
+        version, status, reason = (
+            statusline.decode("iso-8859-1").rstrip("\r\n").split(" ", 2) + [""])[:3]
+        status = int(status)
+        headers = self.read_headers()
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+
+        inner = None
+        if on_text and 200 <= status < 300:
+            inner = TextStream(get_charset(headers.get("content-type", "")), on_text)
+        sink = body_sink(headers.get("content-encoding", ""), inner)
+
+        if status < 200 or status in (204, 304):
+            body = bytearray()
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            sink = sink or BodyBuffer()
+            self.stream_chunked(sink)
+            body = sink.finish()
+        elif "content-length" in headers and not sink:
+            body = self.read_exact(int(headers["content-length"]))
+        elif "content-length" in headers:
+            self.stream(sink, int(headers["content-length"]))
+            body = sink.finish()
+        else:
+            sink = sink or BodyBuffer()
+            self.stream_until_close(sink)
+            body = sink.finish()
+            keep_alive = False
+
+        response = Response(version, status, reason, headers, body, keep_alive)
+        if inner:
+            # A body with a Content-Encoding we can't undo skips the stream.
+            response.decoded = inner.text()
+        response.transferred = self.consumed() - start
+        response.first_byte_at = first_byte_at
+        return response
+
@@ -0,0 +1,129 @@
+import html
+import threading
+import time
+from collections import deque
+
+MAX_NET_LOG_ENTRIES = 200
+
+class RequestTiming:
+    """What one `URL.request` cost, phase by phase.
+
+    Phases that did not happen (no DNS lookup on a reused connection, no
+    network at all on a cache hit) stay None. Durations are in seconds.
+    """
+
+    def __init__(self, url, redirect_chain=()):
+        self.url = url
+        self.redirect_chain = list(redirect_chain)
+        self.started = time.time()
+        self.dns = None
+        self.connect = None
+        self.tls = None
+        self.request_sent = None
+        self.ttfb = None
+        self.download = None
+        self.total = None
+        self.bytes = 0
+        self.status = None
+        self.cache = "miss"
+        self.reused = None
+        self.error = None
+
+    def record_connection(self, conn):
+        self.reused = conn.requests > 0
+        if not self.reused:
+            self.dns = conn.dns_time
+            self.connect = conn.connect_time
+            self.tls = conn.handshake_time if conn.key[0] == "https" else None
+
+    def record_response(self, send_started, sent, response, finished):
+        self.request_sent = sent - send_started
+        self.ttfb = response.first_byte_at - sent
+        self.download = finished - response.first_byte_at
+        self.bytes = response.transferred
+        self.status = response.status
+
+    def finish(self):
+        self.total = time.time() - self.started
+
+class NetLog:
+    """The most recent request timings, oldest dropped first."""
+
+    def __init__(self, max_entries=MAX_NET_LOG_ENTRIES):
+        self.entries = deque(maxlen=max_entries)
+        self.lock = threading.Lock()
+
+    def record(self, timing):
+        timing.finish()
+        with self.lock:
+            self.entries.append(timing)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def generate_page_html(self, stats=None):
+        html_page = """
+<!DOCTYPE html>
+<html>
+<head><title>Net Internals</title></head>
+<body>
+<h1>Net Internals</h1>
+"""
+        for name, values in (stats or {}).items():
+            html_page += f"<h2>{html.escape(name)}</h2><ul>"
+            for key, value in values.items():
+                html_page += f"<li>{html.escape(key)}: {html.escape(format_stat(value))}</li>"
+            html_page += "</ul>"
+
+        entries = self.snapshot()
+        html_page += f"<h2>Requests ({len(entries)})</h2>"
+        if not entries:
+            html_page += "<p>No requests yet.</p>"
+        for timing in reversed(entries):
+            html_page += f"<p><b>{html.escape(timing.url)}</b></p><ul>"
+            for label, value in describe(timing):
+                html_page += f"<li>{label}: {html.escape(value)}</li>"
+            html_page += "</ul>"
+
+        html_page += "</body></html>"
+        return html_page
+
+def format_stat(value):
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    if isinstance(value, dict):
+        return ", ".join(f"{k}={format_stat(v)}" for k, v in value.items())
+    return str(value)
+
+def milliseconds(duration):
+    if duration is None:
+        return "-"
+    return f"{duration * 1000:.1f} ms"
+
+def describe(timing):
+    rows = [
+        ("status", str(timing.status) if timing.status is not None else "-"),
+        ("cache", timing.cache),
+        ("connection", "-" if timing.reused is None
+                       else "reused" if timing.reused else "new"),
+        ("dns", milliseconds(timing.dns)),
+        ("connect", milliseconds(timing.connect)),
+        ("tls", milliseconds(timing.tls)),
+        ("request sent", milliseconds(timing.request_sent)),
+        ("time to first byte", milliseconds(timing.ttfb)),
+        ("download", milliseconds(timing.download)),
+        ("total", milliseconds(timing.total)),
+        ("bytes", str(timing.bytes)),
+    ]
+    if timing.redirect_chain:
+        rows.append(("redirected from", " -> ".join(timing.redirect_chain)))
+    if timing.error:
+        rows.append(("error", timing.error))
+    return rows
+
+NET_LOG = NetLog()
@@ -0,0 +1,72 @@
+import ssl
+import threading
+import time
+
+MAX_TLS_SESSIONS = 256
+
+class TLSClient:
+    """One SSLContext for the whole process, plus a session cache.
+
+    Loading the system CA bundle is done once, and a session saved from
+    one connection to a host lets the next connection to that host resume
+    instead of doing a full handshake.
+    """
+
+    def __init__(self, context=None, max_sessions=MAX_TLS_SESSIONS):
+        self.context = context
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+        self.handshakes = 0
+        self.resumed = 0
+        self.handshake_time = 0.0
+
+    def get_context(self):
+        with self.lock:
+            if self.context is None:
+                self.context = ssl.create_default_context()
+            return self.context
+
+    def wrap(self, sock, host, port):
+        """Does the TLS handshake on `sock`; returns the socket and its duration."""
+        key = (host, port)
+        with self.lock:
+            session = self.sessions.get(key)
+        start = time.time()
+        # A server that won't resume just does a full handshake instead.
+        tls = self.get_context().wrap_socket(
+            sock, server_hostname=host, session=session)
+        elapsed = time.time() - start
+        with self.lock:
+            self.handshakes += 1
+            self.handshake_time += elapsed
+            if tls.session_reused:
+                self.resumed += 1
+        self.save_session(tls, host, port)
+        return tls, elapsed
+
+    def save_session(self, tls, host, port):
+        # TLS 1.3 servers send their session tickets after the handshake,
+        # so this is also called once a response has been read.
+        session = getattr(tls, "session", None)
+        if session is None:
+            return
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions and (host, port) not in self.sessions:
+                del self.sessions[next(iter(self.sessions))]
+            self.sessions[(host, port)] = session
+
+    def clear(self):
+        with self.lock:
+            self.sessions = {}
+
+    def stats(self):
+        return {
+            "handshakes": self.handshakes,
+            "resumed": self.resumed,
+            "handshake_time": self.handshake_time,
+            "sessions": len(self.sessions),
+        }
+
+TLS_CLIENT = TLSClient()
@@ -1,11 +1,27 @@
 import os
-import socket
-import ssl
+import threading
 import time
 from .cache import CACHE
+from .connection import CONNECTION_POOL
+from .dns import RESOLVER
+from .inflight import IN_FLIGHT
+from .redirects import REDIRECT_CACHE
+from .timing import NET_LOG, RequestTiming
+from .tls import TLS_CLIENT
 from core.bookmarks import BOOKMARK_MANAGER
 
 VISITED_URLS = set()
+ACCEPT_ENCODING = "gzip, deflate"
+
+def network_stats():
+    return {
+        "Connection pool": CONNECTION_POOL.stats(),
+        "DNS": RESOLVER.stats(),
+        "TLS": TLS_CLIENT.stats(),
+        "Cache": CACHE.stats(),
+        "Redirects": REDIRECT_CACHE.stats(),
+        "In-flight": IN_FLIGHT.stats(),
+    }
 
 class URL:
     def __init__(self, url):
@@ -75,10 +91,12 @@ class URL:
             port_part = ""
         return self.scheme + "://" + self.host + port_part + self.path
 
-    def request(self, redirect_count=0):
+    def request(self, redirect_chain=(), handle=None, on_text=None):
         if self.scheme == "about" or self.scheme == "bookmarks":
             if self.path == "bookmarks" or self.scheme == "bookmarks":
                 return BOOKMARK_MANAGER.generate_page_html()
+            elif self.path == "net-internals":
+                return NET_LOG.generate_page_html(network_stats())
             elif self.path == "":
                 return ""
             return ""
@@ -86,87 +104,178 @@ class URL:
         if self.scheme == "file":
             cache_key = f"{self.scheme}://{self.path}"
         else:
-            cache_key = f"{self.scheme}://{self.host}{self.path}"
-
-        if cache_key in CACHE:
-            entry = CACHE[cache_key]
-            if time.time() < entry["expires"]:
-                print("-----------------------------------")
-                print("cache hit:", cache_key)
-                print("-----------------------------------")
-                return entry["body"]
-            else:
-                del CACHE[cache_key]
-        
+            cache_key = f"{self.scheme}://{self.host}:{self.port}{self.path}"
+
         MAX_REDIRECTS = 5
-        if redirect_count > MAX_REDIRECTS:
+        if len(redirect_chain) > MAX_REDIRECTS:
             raise Exception("Too many redirects")
         
+        timing = RequestTiming(str(self), redirect_chain)
+        try:
+            content, location = self.load(cache_key, timing, handle, on_text)
+        except Exception as e:
+            timing.error = str(e) or type(e).__name__
+            raise
+        finally:
+            NET_LOG.record(timing)
+        
+        if location is not None:
+            return self.resolve(location).request(
+                redirect_chain + (str(self),), handle, on_text)
+        return content
+
+    def load(self, cache_key, timing, handle=None, on_text=None):
+        """Returns `(content, None)`, or `(None, location)` for a redirect.
+
+        A body fetched from the network with a 2xx status is also passed to
+        `on_text` piece by piece as it downloads. If the download then fails
+        and a stale cached copy is returned instead, `on_text(None)` is
+        called first: the text passed so far should be thrown away.
+        """
+        location = REDIRECT_CACHE.get(cache_key)
+        if location:
+            timing.cache = "redirect-cache"
+            return None, location
+        
+        entry = CACHE.get(cache_key)
+        if entry and entry.is_fresh():
+            timing.cache = "hit"
+            return entry.body, None
+        
+        if entry and entry.can_serve_while_revalidating():
+            # Paint the stale copy now and bring the cache up to date behind it.
+            timing.cache = "stale-while-revalidate"
+            if CACHE.start_revalidation(cache_key):
+                threading.Thread(target=self.revalidate,
+                                 args=(cache_key, entry), daemon=True).start()
+            return entry.body, None
+        
         if self.scheme == "file":
             try:
-                with open(self.path, "r", encoding="utf8") as f:
-                    return f.read()
+                with open(self.path, "rb") as f:
+                    return f.read().decode("utf8", "replace"), None
             except FileNotFoundError:
-                return "<h1>404 File Not Found</h1>"
-            
-        s = socket.socket(family=socket.AF_INET, type=socket.SOCK_STREAM)
-        s.connect((self.host, self.port))
+                return "<h1>404 File Not Found</h1>", None
         
-        if self.scheme == "https":
-            ctx = ssl.create_default_context()
-            s = ctx.wrap_socket(s, server_hostname=self.host)
-        
-        request = "GET {} HTTP/1.1\r\n".format(self.path)
-        request += "HOST: {}\r\n".format(self.host)
-        request += "Connection: close\r\n"  
-        request += "\r\n"
+        streamed = False
+        def stream(text):
+            nonlocal streamed
+            streamed = True
+            on_text(text)
+
+        request_headers = entry.conditional_headers() if entry else {}
+        try:
+            # Identical requests already on the wire are shared, not repeated.
+            flight_key = (cache_key, tuple(sorted(request_headers.items())))
+            status, response_headers, content = IN_FLIGHT.run(
+                flight_key, lambda: self.fetch(request_headers, handle, timing,
+                                               stream if on_text else None), handle)
+        except OSError:
+            if entry and entry.can_serve_on_error():
+                timing.cache = "stale-if-error"
+                if streamed:
+                    # The stale copy replaces what was streamed before
+                    # the connection dropped.
+                    on_text(None)
+                return entry.body, None
+            raise
         
-        s.send(request.encode("utf8"))
+        if timing.status is None:
+            # Another request's fetch answered this one.
+            timing.cache = "coalesced"
+            timing.status = status
         
-        response = s.makefile("r", encoding="utf8", newline="\r\n")
-        statusline = response.readline()
-        version, status, explanation = statusline.split(" ", 2)
-        status = int(status)
+        if status == 304 and entry:
+            timing.cache = "revalidated"
+            CACHE.refresh(cache_key, entry, response_headers)
+            return entry.body, None
         
-        response_headers = {}
-        while True:
-            line = response.readline()
-            if line == "\r\n":
-                break
-            header, value = line.split(":",1)
-            response_headers[header.casefold()] = value.strip()
+        if status >= 500 and entry and entry.can_serve_on_error():
+            timing.cache = "stale-if-error"
+            return entry.body, None
             
         if 300 <= status < 400:
             location = response_headers.get("location")
-            s.close()
             if not location:
-                return ""
-            if location.startswith("http://") or location.startswith("https://"):
-                return URL(location).request(redirect_count + 1)
-            else:
-                new_url = "{}://{}{}".format(self.scheme, self.host, location)
-                return URL(new_url).request(redirect_count + 1)
-        
-        cache_control = response_headers.get("cache-control")
-        content = response.read()
-        s.close()
-        
-        if cache_control:
-            cache_control = cache_control.lower()
-            if "no-store" not in cache_control and "max-age=" in cache_control:
-                try:
-                    max_age = int(cache_control.split("max-age=")[1].split(",")[0])
-                    CACHE[cache_key] = {
-                        "expires": time.time() + max_age,
-                        "body": content
-                    }
-                    print("-----------------------------------")
-                    print(" Cached:", cache_key, f"(max-age={max_age})")
-                    print("-----------------------------------")
-                except:
-                    pass    
+                return "", None
+            REDIRECT_CACHE.put(cache_key, status, location, response_headers)
+            return None, location
         
-        return content
+        CACHE.put(cache_key, content, response_headers, status)
+        return content, None
+
+    def revalidate(self, cache_key, entry):
+        timing = RequestTiming(str(self))
+        timing.cache = "background-revalidation"
+        try:
+            status, response_headers, content = self.fetch(
+                entry.conditional_headers(), timing=timing)
+            if status == 304:
+                CACHE.refresh(cache_key, entry, response_headers)
+            elif 200 <= status < 300:
+                CACHE.put(cache_key, content, response_headers, status)
+        except Exception as e:
+            timing.error = str(e) or type(e).__name__
+        finally:
+            CACHE.finish_revalidation(cache_key)
+            NET_LOG.record(timing)
+
+    def fetch(self, request_headers=None, handle=None, timing=None, on_text=None):
+        streamed = False
+        def stream(text):
+            nonlocal streamed
+            streamed = True
+            on_text(text)
+
+        for attempt in range(2):
+            conn = CONNECTION_POOL.acquire(
+                self.scheme, self.host, self.port, fresh=attempt > 0, handle=handle)
+            reused = conn.requests > 0
+            try:
+                if handle:
+                    handle.attach(conn)
+                if timing:
+                    timing.record_connection(conn)
+                status, response_headers, content, keep_alive = self.send_request(
+                    conn, request_headers or {}, timing, stream if on_text else None)
+            except OSError:
+                CONNECTION_POOL.release(conn, reusable=False)
+                if handle:
+                    handle.check()
+                if not reused or streamed:
+                    # Text already passed on can't be taken back.
+                    raise
+                # The server dropped an idle keep-alive connection between
+                # our staleness check and the send; retry on a fresh one.
+                continue
+            except Exception:
+                CONNECTION_POOL.release(conn, reusable=False)
+                raise
+            finally:
+                if handle:
+                    handle.detach(conn)
+            CONNECTION_POOL.release(conn, reusable=keep_alive)
+            return status, response_headers, content
+
+    def send_request(self, conn, request_headers, timing=None, on_text=None):
+        request = "GET {} HTTP/1.1\r\n".format(self.path)
+        request += "HOST: {}\r\n".format(self.host)
+        request += "Connection: keep-alive\r\n"
+        if ACCEPT_ENCODING:
+            request += "Accept-Encoding: {}\r\n".format(ACCEPT_ENCODING)
+        for header, value in request_headers.items():
+            request += "{}: {}\r\n".format(header, value)
+        request += "\r\n"
+        
+        send_started = time.time()
+        conn.sock.sendall(request.encode("utf8"))
+        sent = time.time()
+        conn.requests += 1
+        
+        response = conn.reader.read_response(on_text)
+        if timing:
+            timing.record_response(send_started, sent, response, time.time())
+        return response.status, response.headers, response.text(), response.keep_alive
     
     def resolve(self, url):
         if self.scheme in ["about", "bookmarks"]:
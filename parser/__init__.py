@@ -1,3 +1,5 @@
 from .lexer import lex
 from .css_parser import CSSParser
 from .html_parser import HTMLParser
+from .preload_scanner import scan_stylesheets, StreamScanner
+from .stylesheet_cache import STYLESHEET_CACHE
@@ -1,13 +1,30 @@
+import re
 from style.selectors import TagSelector, DescendantSelector
 
+# \w is str.isalnum() plus "_", which word() doesn't accept; it is checked
+# for separately.
+WHITESPACE = re.compile(r"\s*")
+WORD = re.compile(r"[\w#.%-]+")
+VALUE = re.compile(r"[^;}]*")
+# The common shapes, `selector words {` and `prop: value;`, matched whole.
+RULE_START = re.compile(r"\s*([\w#.%-]+(?:\s+[\w#.%-]+)*)\s*\{\s*")
+DECLARATION = re.compile(r"([\w#.%-]+)\s*:([^;}]*)(;\s*)?")
+SHORTHANDS = {"font", "margin", "padding"}
+
 class CSSParser:
+    """Parses a stylesheet into `(selector, body)` rules.
+
+    Well-formed rules and declarations are matched whole by regex. Anything
+    else falls back to the step-by-step parser from the same place, which
+    decides what to skip.
+    """
+
     def __init__(self, s):
         self.s = s
         self.i = 0
     
     def whitespace(self):
-        while self.i < len(self.s) and self.s[self.i].isspace():
-            self.i += 1
+        self.i = WHITESPACE.match(self.s, self.i).end()
     
     def selector(self):
         out = TagSelector(self.word().casefold())
@@ -20,15 +37,14 @@ class CSSParser:
         return out
     
     def word(self):
-        start = self.i
-        while self.i < len(self.s):
-            if self.s[self.i].isalnum() or self.s[self.i] in "#-.%":
-                self.i += 1
-            else:
-                break
-        if self.i == start:
+        match = WORD.match(self.s, self.i)
+        word = match.group() if match else ""
+        if "_" in word:
+            word = word[:word.index("_")]
+        if not word:
             raise Exception("Parsing error")
-        return self.s[start:self.i]
+        self.i += len(word)
+        return word
     
     def literal(self, literal):
         if not (self.i < len(self.s) and self.s[self.i] == literal):
@@ -38,6 +54,10 @@ class CSSParser:
     def parse(self):
         rules = []
         while self.i < len(self.s):
+            rule = self.simple_rule()
+            if rule:
+                rules.append(rule)
+                continue
             try:
                 self.whitespace()
                 selector = self.selector()
@@ -55,6 +75,62 @@ class CSSParser:
                     break
         return rules
 
+    def simple_rule(self):
+        # `words {` then well-formed declarations then `}`, or None with
+        # nothing consumed.
+        match = RULE_START.match(self.s, self.i)
+        if not match or "_" in match.group(1):
+            return None
+        start = self.i
+        self.i = match.end()
+        body = self.simple_body()
+        if body is None or self.i >= len(self.s):
+            self.i = start
+            return None
+        self.i += 1
+
+        words = match.group(1).split()
+        selector = TagSelector(words[0].casefold())
+        for word in words[1:]:
+            selector = DescendantSelector(selector, TagSelector(word.casefold()))
+        return selector, body
+
+    def simple_body(self):
+        # Declarations up to a "}" or the end, or None with nothing
+        # consumed if any of them needs error recovery.
+        pairs = {}
+        i = self.i
+        while True:
+            match = DECLARATION.match(self.s, i)
+            if not match:
+                break
+            prop, val, semicolon = match.groups()
+            if "_" in prop:
+                return None
+            self.add_pair(pairs, *self.declaration(prop, val))
+            i = match.end()
+            if not semicolon:
+                break
+        if i < len(self.s) and self.s[i] != "}":
+            return None
+        self.i = i
+        return pairs
+
+    def declaration(self, prop, val):
+        val = val.strip()
+        important = False
+        if "!important" in val:
+            important = True
+            val = val.replace("!important", "").strip()
+        return prop.casefold(), val, important
+
+    def add_pair(self, pairs, prop, val, important):
+        if prop not in SHORTHANDS:
+            pairs[prop] = (val, important)
+            return
+        for key, value in self.expand_shorthand(prop, val).items():
+            pairs[key] = (value, important)
+
     def pair(self):
         prop = self.word()
         self.whitespace()
@@ -62,25 +138,17 @@ class CSSParser:
         self.whitespace()
         
         val_start = self.i
-        while self.i < len(self.s) and self.s[self.i] not in [";", "}"]:
-            self.i += 1
-        val = self.s[val_start:self.i].strip()
-        
-        important = False
-        if "!important" in val:
-            important = True
-            val = val.replace("!important", "").strip()
-        
-        return prop.casefold(), val, important
+        self.i = VALUE.match(self.s, self.i).end()
+        return self.declaration(prop, self.s[val_start:self.i])
     
     def body(self):
+        pairs = self.simple_body()
+        if pairs is not None:
+            return pairs
         pairs = {}
         while self.i < len(self.s) and self.s[self.i] != "}":
             try:
-                prop, val, important = self.pair()
-                expanded = self.expand_shorthand(prop, val)
-                for key, value in expanded.items():
-                    pairs[key] = (value, important)
+                self.add_pair(pairs, *self.pair())
                 self.whitespace()
                 self.literal(";")
                 self.whitespace()
@@ -160,9 +228,9 @@ class CSSParser:
         return expanded
     
     def ignore_until(self, chars):
-        while self.i < len(self.s):
-            if self.s[self.i] in chars:
-                return self.s[self.i]
-            else:
-                self.i += 1
-        return None
+        found = [i for i in (self.s.find(c, self.i) for c in chars) if i >= 0]
+        if not found:
+            self.i = len(self.s)
+            return None
+        self.i = min(found)
+        return self.s[self.i]
@@ -1,11 +1,23 @@
-from dom.nodes import Text, Element
+from dom.nodes import Text, Element, Document
+from dom.index import DocumentIndex
 from config.constants import SELF_CLOSING_TAGS
-from .lexer import lex, TextToken, TagToken
+from dom.utils import walk, copy_tree
+from .lexer import StreamLexer, TextToken, TagToken
 
 class HTMLParser:
-    def __init__(self, body):
+    """Builds a DOM tree from HTML.
+
+    Either call `parse()` on a whole document, or `feed()` it pieces as
+    they arrive and `close()` at the end. Elements are attached to their
+    parent as soon as they open, so `snapshot()` can copy out the part of
+    the tree parsed so far. The root is a `Document` whose `index` is
+    filled in as elements are added.
+    """
+
+    def __init__(self, body=""):
         self.body = body
         self.unfinished = []
+        self.lexer = StreamLexer()
     
     def add_text(self, text):
         if text.isspace():
@@ -17,80 +29,61 @@ class HTMLParser:
         node = Text(text, parent)
         parent.children.append(node)
     
-    def get_attributes(self, text):
-        parts = []
-        current = ""
-        in_quotes = False
-        quote_char = None
-        
-        for char in text:
-            if char in ['"', "'"]:
-                if not in_quotes:
-                    in_quotes = True
-                    quote_char = char
-                elif char == quote_char:
-                    in_quotes = False
-                    quote_char = None
-                current += char
-            elif char.isspace() and not in_quotes:
-                if current:
-                    parts.append(current)
-                    current = ""
-            else:
-                current += char
-        
-        if current:
-            parts.append(current)
-        
-        if not parts:
-            return "", {}
-        
-        tag = parts[0].casefold()
-        attributes = {}
-        
-        for attrpair in parts[1:]:
-            if "=" in attrpair:
-                key, value = attrpair.split("=", 1)
-                if len(value) > 2 and value[0] in ["'", "\""]:
-                    value = value[1:-1]
-                attributes[key.casefold()] = value
-            else:
-                attributes[attrpair.casefold()] = ""
-        return tag, attributes
-        
-    def add_tag(self, tag):
-        tag, attributes = self.get_attributes(tag)
+    def add_tag(self, tag, attributes):
         if tag.startswith("!"):
             return
         if tag.startswith("/"):
             if len(self.unfinished) == 1: return
-            node = self.unfinished.pop()
-            parent = self.unfinished[-1]
-            parent.children.append(node)
+            self.unfinished.pop()
         elif tag in SELF_CLOSING_TAGS:
             parent = self.unfinished[-1]
             node = Element(tag, attributes, parent)
             parent.children.append(node)
+            self.unfinished[0].index.add(node)
         else:
             parent = self.unfinished[-1] if self.unfinished else None
             node = Element(tag, attributes, parent)
+            if parent:
+                parent.children.append(node)
+            self.unfinished[0].index.add(node)
             self.unfinished.append(node)
     
-    def finish(self):
-        while len(self.unfinished) > 1:
-            node = self.unfinished.pop()
-            parent = self.unfinished[-1]
-            parent.children.append(node)
-        return self.unfinished.pop()
-    
-    def parse(self):
-        self.unfinished = [Element("html", {}, None)]
-        tokens = lex(self.body)
-        
+    def add_tokens(self, tokens):
         for token in tokens:
             if isinstance(token, TextToken):
                 self.add_text(token.text)
             elif isinstance(token, TagToken):
-                self.add_tag(token.tag)
-        
+                self.add_tag(token.tag, token.attributes)
+    
+    def finish(self):
+        root = self.unfinished[0]
+        self.unfinished = []
+        return root
+    
+    def feed(self, chunk):
+        if not self.unfinished:
+            self.unfinished = [Document(DocumentIndex())]
+        self.add_tokens(self.lexer.feed(chunk))
+    
+    def close(self):
+        if not self.unfinished:
+            self.unfinished = [Document(DocumentIndex())]
+        self.add_tokens(self.lexer.close())
         return self.finish()
+    
+    def snapshot(self):
+        """Returns a copy of the tree parsed so far."""
+        document = Document(DocumentIndex())
+        if self.unfinished:
+            for child in self.unfinished[0].children:
+                document.children.append(copy_tree(child, document))
+        for node in walk(document):
+            if isinstance(node, Element) and node is not document:
+                document.index.add(node)
+        return document
+    
+    def parse(self):
+        self.unfinished = [Document(DocumentIndex())]
+        self.lexer = StreamLexer()
+        self.feed(self.body)
+        return self.close()
@@ -1,33 +1,84 @@
+import re
+import sys
+
+# Every "<" starts a tag and every ">" ends one; the text in between is
+# taken as a slice rather than built up a character at a time.
+DELIMITER = re.compile(r"[<>]")
+# One whitespace-separated part of a tag. A quoted run may contain
+# whitespace, and an unclosed quote runs to the end of the tag.
+TAG_PART = re.compile(r"""(?:[^\s"']+|"[^"]*"?|'[^']*'?)+""")
+
 class TextToken:
+    __slots__ = ("text",)
+
     def __init__(self, text):
         self.text = text
     def __repr__(self):
         return repr(self.text)
 
 class TagToken:
-    def __init__(self, tag):
-        self.tag = tag.strip().casefold()
+    __slots__ = ("tag", "attributes")
+
+    def __init__(self, text):
+        self.tag, self.attributes = split_tag(text.strip().casefold())
     def __repr__(self):
         return "<" + self.tag + ">"
 
+def split_tag(text):
+    """Splits the text between "<" and ">" into a tag name and attributes.
+
+    Tag names and attribute keys are interned, so the thousands of
+    elements on a page share one string per name.
+    """
+    if '"' in text or "'" in text:
+        parts = TAG_PART.findall(text)
+    else:
+        parts = text.split()
+    if not parts:
+        return "", {}
+
+    tag = sys.intern(parts[0].casefold())
+    attributes = {}
+    for attrpair in parts[1:]:
+        key, eq, value = attrpair.partition("=")
+        if eq and len(value) > 2 and value[0] in "'\"":
+            value = value[1:-1]
+        attributes[sys.intern(key.casefold())] = value
+    return tag, attributes
+
+class StreamLexer:
+    """Lexes a document that arrives in pieces.
+
+    Whatever follows the last "<" or ">" of a piece is held back until the
+    next one, so tokens come out the same however the input was split.
+    """
+
+    def __init__(self):
+        self.pending = ""
+        self.in_tag = False
+
+    def feed(self, chunk):
+        body = self.pending + chunk if self.pending else chunk
+        start = 0
+        for match in DELIMITER.finditer(body):
+            end = match.start()
+            if match.group() == "<":
+                if end > start:
+                    yield TextToken(body[start:end])
+                self.in_tag = True
+            else:
+                yield TagToken(body[start:end])
+                self.in_tag = False
+            start = end + 1
+        self.pending = body[start:]
+
+    def close(self):
+        if self.pending and not self.in_tag:
+            yield TextToken(self.pending)
+        self.pending = ""
+
 def lex(body):
-    out = []
-    buffer = ""
-    in_tag = False
-    for c in body:
-        if c == "<":
-            if buffer: 
-                out.append(TextToken(buffer))
-                buffer = ""
-            in_tag = True
-        elif c == ">":
-            out.append(TagToken(buffer))
-            buffer = ""
-            in_tag = False
-        else:
-            buffer += c
-            
-    if buffer and not in_tag:
-        out.append(TextToken(buffer))
-    
-    return out
+    """Yields the text and tag tokens of `body` as they are found."""
+    lexer = StreamLexer()
+    yield from lexer.feed(body)
+    yield from lexer.close()
@@ -0,0 +1,46 @@
+import re
+from .lexer import split_tag
+
+# Matches a whole <link ...> tag the same way the lexer does: from "<" to
+# the next ">".
+LINK_TAG = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+
+def scan_stylesheets(body):
+    """Finds stylesheet hrefs in raw HTML, without building a DOM.
+
+    Hrefs come out exactly as HTMLParser would put them in the tree, so a
+    fetch started from here can be matched up with the <link> element
+    later.
+    """
+    hrefs = []
+    for match in LINK_TAG.finditer(body):
+        text = match.group(0)[1:-1].strip().casefold()
+        tag, attributes = split_tag(text)
+        if tag != "link" or attributes.get("rel") != "stylesheet":
+            continue
+        href = attributes.get("href")
+        if href is not None and href not in hrefs:
+            hrefs.append(href)
+    return hrefs
+
+class StreamScanner:
+    """Runs `scan_stylesheets` over a document that arrives in pieces.
+
+    A tag cut off at the end of a piece is held back for the next one, and
+    each href is only reported once.
+    """
+
+    def __init__(self):
+        self.pending = ""
+        self.seen = set()
+
+    def feed(self, chunk):
+        text = self.pending + chunk
+        cut = text.rfind("<")
+        if cut > text.rfind(">"):
+            text, self.pending = text[:cut], text[cut:]
+        else:
+            self.pending = ""
+        hrefs = [href for href in scan_stylesheets(text) if href not in self.seen]
+        self.seen.update(hrefs)
+        return hrefs
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from config.paths import BROWSER_CSS_PATH
+from .css_parser import CSSParser
+
+# Counted in characters of stylesheet source, which tracks the size of
+# the parsed rules closely enough.
+MAX_STYLESHEET_CACHE_SIZE = 8 * 1024 * 1024
+
+class StylesheetCache:
+    """Parsed stylesheets, shared by every tab.
+
+    Sheets are keyed by URL and a hash of their text, so the same sheet
+    fetched by two tabs is parsed once, and a changed sheet at the same
+    URL is parsed again. Rule lists come back as tuples and are shared;
+    nothing may modify them or their declaration dicts.
+    """
+
+    def __init__(self, max_size=MAX_STYLESHEET_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def parse(self, url, text):
+        key = (str(url), hashlib.sha256(text.encode("utf-8", "replace")).hexdigest())
+        return self.get_or_parse(key, text)
+
+    def default_sheet(self, path=BROWSER_CSS_PATH):
+        """The browser's own stylesheet, re-read only when its mtime changes."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return ()
+        key = (str(path), mtime)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return ()
+        return self.get_or_parse(key, text)
+
+    def get_or_parse(self, key, text):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Parse outside the lock; two threads racing on the same new sheet
+        # just both parse it.
+        rules = tuple(CSSParser(text).parse())
+        size = len(text)
+        with self.lock:
+            if key in self.entries or size > self.max_size:
+                return rules
+            self.entries[key] = (rules, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+        return rules
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "size": self.size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+STYLESHEET_CACHE = StylesheetCache()
@@ -1,5 +1,5 @@
-def paint_tree(layout_object, display_list):
-    display_list.extend(layout_object.paint())
+from dom.utils import walk
 
-    for child in layout_object.children:
-        paint_tree(child, display_list)
+def paint_tree(layout_object, display_list):
+    for obj in walk(layout_object):
+        display_list.extend(obj.paint())
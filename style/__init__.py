@@ -1,2 +1,5 @@
 from .selectors import TagSelector, DescendantSelector, cascade_priority
 from .style_engine import style
+from .computed_style import ComputedStyle
+from .rule_index import RuleIndex
+from .ancestor_filter import AncestorFilter
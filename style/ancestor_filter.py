@@ -0,0 +1,74 @@
+# A power of two, so a hash can be masked down to a slot.
+ANCESTOR_FILTER_SIZE = 4096
+
+class AncestorFilter:
+    """A counting Bloom filter of the tags and classes of a node's ancestors.
+
+    The style traversal pushes each element before styling its children
+    and pops it on the way back out. DescendantSelector asks it whether
+    every tag and class its ancestor parts need could be above the node;
+    if one certainly isn't, the selector fails without walking the parent
+    chain. Tags and classes share the filter, which only adds false
+    positives, and those fall through to the walk.
+    """
+
+    def __init__(self, size=ANCESTOR_FILTER_SIZE):
+        self.mask = size - 1
+        self.shift = size.bit_length() - 1
+        self.counts = [0] * size
+        self.stack = []
+
+        self.queries = 0
+        self.fast_rejects = 0
+
+    def start(self, tree):
+        """Empties the filter and fills it with the ancestors of `tree`."""
+        self.counts = [0] * (self.mask + 1)
+        self.stack = []
+        ancestors = []
+        node = tree.parent
+        while node is not None:
+            ancestors.append(node)
+            node = node.parent
+        for node in reversed(ancestors):
+            self.push(node)
+
+    def enter(self, node):
+        """Pops elements until the top of the stack is `node`'s parent."""
+        while self.stack and self.stack[-1] is not node.parent:
+            self.pop()
+
+    def push(self, element):
+        self.stack.append(element)
+        self.add(element, 1)
+
+    def pop(self):
+        self.add(self.stack.pop(), -1)
+
+    def add(self, element, delta):
+        counts = self.counts
+        mask = self.mask
+        shift = self.shift
+        for name in (element.tag, *element.classes):
+            h = hash(name)
+            counts[h & mask] += delta
+            counts[(h >> shift) & mask] += delta
+
+    def may_contain_all(self, names):
+        self.queries += 1
+        counts = self.counts
+        mask = self.mask
+        shift = self.shift
+        for name in names:
+            h = hash(name)
+            if not counts[h & mask] or not counts[(h >> shift) & mask]:
+                self.fast_rejects += 1
+                return False
+        return True
+
+    def stats(self):
+        return {
+            "queries": self.queries,
+            "fast_rejects": self.fast_rejects,
+            "depth": len(self.stack),
+        }
@@ -0,0 +1,52 @@
+INHERITED_PROPERTIES = {
+    "font-size": "16px",
+    "font-style": "normal",
+    "font-weight": "normal",
+    "color": "black",
+    "display": "inline",
+}
+
+class ComputedStyle(dict):
+    """A node's computed style, shared between nodes and never modified.
+
+    A node whose rules change nothing gets its parent's inherited style
+    object itself rather than a copy; a new style is only built for a
+    node with a property that differs. `inherited` holds the part that
+    children start from, or None when every property here is inherited
+    and the children can share this style as is.
+    """
+
+    __slots__ = ("inherited",)
+
+    def __init__(self, values, inherited=None):
+        super().__init__(values)
+        self.inherited = inherited
+
+    def for_children(self):
+        return self if self.inherited is None else self.inherited
+
+    def derive(self, changes):
+        """A style like this one with `changes` applied, sharing what it can."""
+        changes = {prop: value for prop, value in changes.items()
+                   if self.get(prop) != value}
+        if not changes:
+            return self
+        values = dict(self)
+        values.update(changes)
+        changed_inherited = [prop in INHERITED_PROPERTIES for prop in changes]
+        if all(changed_inherited) and self.inherited is None:
+            return ComputedStyle(values)
+        if not any(changed_inherited):
+            return ComputedStyle(values, self.for_children())
+        inherited = ComputedStyle(
+            {prop: values[prop] for prop in INHERITED_PROPERTIES})
+        return ComputedStyle(values, inherited)
+
+    def read_only(self, *args, **kwargs):
+        raise TypeError("computed styles are shared and cannot be modified")
+
+    __setitem__ = __delitem__ = read_only
+    clear = pop = popitem = setdefault = update = __ior__ = read_only
+
+# What the root of every document inherits from.
+ROOT_STYLE = ComputedStyle(INHERITED_PROPERTIES)
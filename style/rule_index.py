@@ -0,0 +1,72 @@
+from dom.nodes import Element
+from .selectors import TagSelector, DescendantSelector
+
+# Added to the priority of a declaration marked !important.
+IMPORTANT_PRIORITY = 10000
+
+def rightmost(selector):
+    if isinstance(selector, DescendantSelector):
+        return selector.selectors[-1]
+    return selector
+
+class RuleIndex:
+    """A stylesheet's rules, bucketed so each node is only tested against
+    rules that could match it.
+
+    Each rule is filed under the tag or class of its rightmost selector;
+    rules whose selectors aren't understood here go in a universal bucket
+    that every node is tested against. A rule's declarations are split
+    into its !important and normal ones, and both parts are ranked once,
+    by priority and then stylesheet order. Walking a node's candidates in
+    rank order, the first value seen for a property is the one that wins
+    the cascade.
+    """
+
+    def __init__(self, rules):
+        parts = []
+        for order, (selector, body) in enumerate(rules):
+            important = {prop: val for prop, (val, flag) in body.items() if flag}
+            normal = {prop: val for prop, (val, flag) in body.items() if not flag}
+            if important:
+                parts.append((-(selector.priority + IMPORTANT_PRIORITY), order,
+                              selector, important))
+            if normal:
+                parts.append((-selector.priority, order, selector, normal))
+        parts.sort(key=lambda part: part[:2])
+
+        self.by_tag = {}
+        self.by_class = {}
+        self.universal = []
+        for rank, (negative_priority, _, selector, declarations) in enumerate(parts):
+            entry = (rank, selector, -negative_priority, declarations)
+            last = rightmost(selector)
+            if not isinstance(last, TagSelector):
+                self.universal.append(entry)
+            elif last.class_name:
+                self.by_class.setdefault(last.class_name, []).append(entry)
+            else:
+                self.by_tag.setdefault(last.tag, []).append(entry)
+
+    def candidates(self, node):
+        """The entries that might match `node`, in rank order."""
+        if not isinstance(node, Element):
+            return self.universal
+        buckets = [self.by_tag.get(node.tag)]
+        buckets.extend(self.by_class.get(name) for name in node.classes)
+        buckets.append(self.universal)
+        buckets = [bucket for bucket in buckets if bucket]
+        if len(buckets) == 1:
+            return buckets[0]
+        return sorted(entry for bucket in buckets for entry in bucket)
+
+    def cascade(self, node, ancestors=None):
+        """Maps each property set by a matching rule to its winning
+        `(priority, value)`. `ancestors` is the AncestorFilter of the
+        traversal, if there is one."""
+        winners = {}
+        for _, selector, priority, declarations in self.candidates(node):
+            if selector.matches(node, ancestors):
+                for prop, val in declarations.items():
+                    if prop not in winners:
+                        winners[prop] = (priority, val)
+        return winners
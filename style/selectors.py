@@ -11,13 +11,12 @@ class TagSelector:
             self.tag = None
             self.priority = 10
 
-    def matches(self, node):
+    def matches(self, node, ancestors=None):
         if not isinstance(node, Element):
             return False
 
         if self.class_name:
-            node_classes = node.attributes.get("class", "").split()
-            return self.class_name in node_classes
+            return self.class_name in node.classes
 
         return self.tag == node.tag
 
@@ -29,14 +28,20 @@ class DescendantSelector:
             self.selectors = [ancestor, descendant]
 
         self.priority = sum(sel.priority for sel in self.selectors)
+        # What an AncestorFilter is asked about before the parent walk.
+        self.ancestor_names = [sel.class_name or sel.tag
+                               for sel in self.selectors[:-1]]
 
-    def matches(self, node):
+    def matches(self, node, ancestors=None):
         if not self.selectors[-1].matches(node):
             return False
 
         if len(self.selectors) == 1:
             return True
 
+        if ancestors is not None and not ancestors.may_contain_all(self.ancestor_names):
+            return False
+
         selector_idx = len(self.selectors) - 2
         current = node.parent
 
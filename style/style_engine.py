@@ -1,67 +1,63 @@
+from functools import lru_cache
 from dom.nodes import Element
+from dom.utils import walk
+from .computed_style import ROOT_STYLE
+from .rule_index import RuleIndex, IMPORTANT_PRIORITY
+from .ancestor_filter import AncestorFilter
+# A module import, not `from ... import CSSParser`: css_parser imports
+# style.selectors, so this module can be loaded while css_parser is
+# still half-initialised.
+import parser.css_parser as css_parser
 
+# Templated pages repeat the same few style attributes over and over.
+MAX_INLINE_STYLES = 1024
 
-INHERITED_PROPERTIES = {
-    "font-size": "16px",
-    "font-style": "normal",
-    "font-weight": "normal",
-    "color": "black",
-    "display": "inline",
-}
 
-def style(node, rules, url):
-    node.style = {}
+@lru_cache(maxsize=MAX_INLINE_STYLES)
+def parse_inline_style(text):
+    # The result is shared between every element with this attribute, so
+    # it must not be modified.
+    return css_parser.CSSParser(text + ";").body()
 
-    for prop, default in INHERITED_PROPERTIES.items():
-        if node.parent:
-            node.style[prop] = node.parent.style[prop]
-        else:
-            node.style[prop] = default
+def style(tree, rules, url, ancestors=None):
+    # `rules` may be a RuleIndex already built for them. Pass an
+    # AncestorFilter to read its counters afterwards.
+    index = rules if isinstance(rules, RuleIndex) else RuleIndex(rules)
+    if ancestors is None:
+        ancestors = AncestorFilter()
+    ancestors.start(tree)
+    # Document order styles every parent before its children.
+    for node in walk(tree):
+        ancestors.enter(node)
+        style_node(node, index, ancestors)
+        if node.children:
+            ancestors.push(node)
+
+def style_node(node, index, ancestors=None):
+    base = node.parent.style.for_children() if node.parent else ROOT_STYLE
 
-    all_properties = {}
-    
-    for selector, body in rules:
-        if selector.matches(node):
-            base_priority = selector.priority
-            for prop, (val, important) in body.items():
-                priority = base_priority + (10000 if important else 0)
-                
-                if prop not in all_properties:
-                    all_properties[prop] = []
-                all_properties[prop].append((priority, val))
-    
-    for prop, values in all_properties.items():
-        values.sort(key=lambda x: x[0], reverse=True)
-        node.style[prop] = values[0][1]
+    winners = index.cascade(node, ancestors)
+    changes = {prop: val for prop, (_, val) in winners.items()}
 
     if isinstance(node, Element) and "style" in node.attributes:
-        from parser.css_parser import CSSParser
-        parser = CSSParser(node.attributes["style"] + ";")
-        pairs = parser.body()
+        pairs = parse_inline_style(node.attributes["style"])
         
         for prop, (val, important) in pairs.items():
-            inline_priority = 1000 + (10000 if important else 0)
+            inline_priority = 1000 + (IMPORTANT_PRIORITY if important else 0)
             
-            if prop in all_properties:
-                max_stylesheet_priority = max(v[0] for v in all_properties[prop])
-                if inline_priority > max_stylesheet_priority:
-                    node.style[prop] = val
+            if prop in winners:
+                if inline_priority > winners[prop][0]:
+                    changes[prop] = val
             else:
-                node.style[prop] = val
+                changes[prop] = val
 
-    if node.style.get("font-size", "").endswith("%"):
-        pct = float(node.style["font-size"][:-1]) / 100
-        if node.parent:
-            parent_font = node.parent.style.get("font-size", "16px")
-            if parent_font and parent_font.endswith("px"):
-                parent_px = int(parent_font[:-2])
-            else:
-                parent_px = 16
+    if changes.get("font-size", "").endswith("%"):
+        pct = float(changes["font-size"][:-1]) / 100
+        parent_font = base["font-size"]
+        if parent_font.endswith("px"):
+            parent_px = int(parent_font[:-2])
         else:
-            from config.constants import INHERITED_PROPERTIES as DEFAULTS 
-            # Actually INHERITED_PROPERTIES is local here, but let's use the local one
-            parent_px = int(INHERITED_PROPERTIES["font-size"][:-2])
-        node.style["font-size"] = str(int(parent_px * pct)) + "px"
-    
-    for child in node.children:
-        style(child, rules, url)
+            parent_px = 16
+        changes["font-size"] = str(int(parent_px * pct)) + "px"
+
+    node.style = base.derive(changes)
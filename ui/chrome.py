@@ -140,9 +140,9 @@ class Chrome:
             self.forward_rect.top,
             ">", self.font, forward_color))
         
-        current_url = str(self.window.active_tab.url)
+        current_url = str(self.window.active_tab.display_url)
         is_bookmarked = BOOKMARK_MANAGER.contains(current_url)
-        show_bookmark = self.window.active_tab.url.scheme in ["http", "https"]
+        show_bookmark = self.window.active_tab.display_url.scheme in ["http", "https"]
 
         if show_bookmark:
             bookmark_color = "gold" if is_bookmarked else "white"
@@ -186,7 +186,7 @@ class Chrome:
                 "red", 1))
             
         else:
-            url = str(self.window.active_tab.url)
+            url = str(self.window.active_tab.display_url)
             cmds.append(DrawText(
                 self.address_rect.left + self.padding,
                 self.address_rect.top,
@@ -245,7 +245,7 @@ class Chrome:
                 self.window.active_tab.go_forward()
 
             elif self.bookmark_rect.contains_point(x, y):
-                if self.window.active_tab.url.scheme in ["http", "https"]:
+                if self.window.active_tab.display_url.scheme in ["http", "https"]:
                     self.toggle_bookmark()
             
             elif self.bookmarks_list_rect.contains_point(x, y):
@@ -282,8 +282,8 @@ class Chrome:
         return False
     
     def toggle_bookmark(self):
-        current_url = str(self.window.active_tab.url)
-        if self.window.active_tab.url.scheme in ["http", "https"]:
+        current_url = str(self.window.active_tab.display_url)
+        if self.window.active_tab.display_url.scheme in ["http", "https"]:
             BOOKMARK_MANAGER.toggle(current_url)
 
     def copy(self):